@@ -3,40 +3,84 @@
 # SPDX-License-Identifier: BSD-3-Clause
 # Copyright (c) 2025, UChicago Argonne, LLC.
 # Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# Usage: compute_pca_encoding.py [nblocks] [basename]
+#
+# With nblocks > 1, a separate basis is fitted for each of the nblocks
+# column strips (the columns a PCACompBlock instance sees), in parallel
+# across strips, and saved as {basename}-encoding-nblocks{nblocks}.npy
+# with shape (nblocks, nframes, nrows*width).
+#
 
+import sys
 import numpy as np
 import math as m
 from scipy import linalg as la
+from concurrent.futures import ProcessPoolExecutor
 
 dpath='data'
 bname='data1small'
-datafn = f'{dpath}/{bname}.npz'
-print(f'datafn={datafn}')
+nblocks = 1
 
-data = np.load(datafn)["data"]
-print(f'data.shape={data.shape}')
-data = np.reshape(data, (data.shape[0], data.shape[1] * data.shape[2]))
-print(f'data.shape={data.shape}')
+if len(sys.argv) > 1:
+    nblocks = int(sys.argv[1])
+if len(sys.argv) > 2:
+    bname = sys.argv[2]
 
-# the covariance matrix
-cov = np.cov(data)
 
-# eigenvalues (encoding) and eigenvectors of cov (weighting)
-encoding, weighting = la.eigh(cov)
-print(f"encoding.shape={encoding.shape}")
-print(f"weighting.shape={weighting.shape}")
+def compute_encoding(data):
+    # the covariance matrix
+    cov = np.cov(data)
 
-idx = np.argsort(encoding)[::-1]
-encoding = encoding[idx]
-weighting = weighting[:,idx]
+    # eigenvalues (encoding) and eigenvectors of cov (weighting)
+    encoding, weighting = la.eigh(cov)
 
-encoding = np.matmul(weighting.T, data)
+    idx = np.argsort(encoding)[::-1]
+    encoding = encoding[idx]
+    weighting = weighting[:,idx]
 
-encodingfn=f'{dpath}/{bname}-encoding.npy'
-weightingfn=f'{dpath}/{bname}-weighting.npy'
-print(f"Saving {encodingfn} and {weightingfn}")
-np.save(encodingfn, encoding)
-np.save(weightingfn, weightingfn)
+    encoding = np.matmul(weighting.T, data)
+    return (encoding, weighting)
 
 
+def compute_strip_encoding(strip):
+    return compute_encoding(strip)[0]
 
+
+if __name__ == '__main__':
+    datafn = f'{dpath}/{bname}.npz'
+    print(f'datafn={datafn}')
+
+    data = np.load(datafn)["data"]
+    print(f'data.shape={data.shape}')
+
+    if nblocks == 1:
+        data = np.reshape(data, (data.shape[0], data.shape[1] * data.shape[2]))
+        print(f'data.shape={data.shape}')
+
+        encoding, weighting = compute_encoding(data)
+        print(f"encoding.shape={encoding.shape}")
+        print(f"weighting.shape={weighting.shape}")
+
+        encodingfn=f'{dpath}/{bname}-encoding.npy'
+        weightingfn=f'{dpath}/{bname}-weighting.npy'
+        print(f"Saving {encodingfn} and {weightingfn}")
+        np.save(encodingfn, encoding)
+        np.save(weightingfn, weighting)
+    else:
+        (nframes, nrows, ncols) = data.shape
+        if ncols % nblocks != 0:
+            print(f'ncols={ncols} is not divisible by nblocks={nblocks}')
+            sys.exit(1)
+        width = ncols // nblocks
+        strips = [data[:, :, b*width:(b+1)*width].reshape(nframes, nrows*width).astype('float64')
+                  for b in range(nblocks)]
+        print(f'strips: {nblocks} x {strips[0].shape}')
+
+        with ProcessPoolExecutor() as ex:
+            encoding = np.stack(list(ex.map(compute_strip_encoding, strips)))
+        print(f"encoding.shape={encoding.shape}")
+
+        encodingfn=f'{dpath}/{bname}-encoding-nblocks{nblocks}.npy'
+        print(f"Saving {encodingfn}")
+        np.save(encodingfn, encoding)
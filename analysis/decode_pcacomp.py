@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# This code runs the batched decoder on the raw integer outputs of the
+# quantized compressor and reports the decode throughput against the
+# sensor frame rate.
+#
+# This code requires the same data files as estimate_pcacomp_error_mem.py:
+#   image frame data : data/{basename}.npy
+#   encoding data    : data/{basename}-encoding.npy
+#
+# The coefficients can also be stored to, or replayed from, a packed
+# container (see save_packed() in pcacomp.py). The record width is
+# calcsumbw() of --config with the frame geometry of the data.
+#
+# Usage: decode_pcacomp.py [options]
+#
+
+import argparse
+import time
+
+from pcacomp import *
+
+
+parser = argparse.ArgumentParser(description='Batched PCA decompression benchmark')
+parser.add_argument('--sprime', type=int, default=None, help='number of principal components (default: 25, or that of --packed)')
+parser.add_argument('--nbits', type=int, default=8, help='IEM bit width including the sign bit')
+parser.add_argument('--basename', default='data1small')
+parser.add_argument('--prec', default='float32', choices=['float32', 'float64'])
+parser.add_argument('--tile', type=int, default=256, help='frames per GEMM')
+parser.add_argument('--fps', type=float, default=1000.0, help='sensor frame rate to keep up with')
+parser.add_argument('--out', default=None, help='write decoded frames to this memory-mapped .npy')
+parser.add_argument('--save-packed', default=None, help='store the coefficients in a packed container')
+parser.add_argument('--packed', default=None, help='decode the coefficients of a packed container')
+parser.add_argument('--config', default=DEFAULT_CONFIG, help='hardware config (pxbw, encbw, nblocks) for the record width')
+args = parser.parse_args()
+
+datafn = f'data/{args.basename}.npy'
+encfn  = f'data/{args.basename}-encoding.npy'
+
+reader = None
+sprime = args.sprime or 25
+if args.packed:
+    # the container fixes sprime, and it must hold one record per data frame
+    reader = PackedReader(args.packed)
+    if args.sprime is not None and args.sprime != reader.sprime:
+        print(f'{args.packed}: holds sprime={reader.sprime}, not --sprime {args.sprime}')
+        sys.exit(1)
+    sprime = reader.sprime
+
+(data, redenc, invenc, data_shape_orig) = loadfiles(sprime, datafn, encfn, False)
+nframes, npixels = data.shape
+
+if reader is not None:
+    if len(reader) != nframes:
+        print(f'{args.packed}: holds {len(reader)} frames, {datafn} has {nframes}')
+        sys.exit(1)
+    if redenc.shape[0] < sprime:
+        print(f'{args.packed}: holds sprime={sprime}, {encfn} has {redenc.shape[0]} PCs')
+        sys.exit(1)
+    (coefs, qv) = (reader.frames(), reader.qv)
+    print(f'loaded {args.packed}: redbw={reader.redbw} sprime={sprime} frames={len(coefs)}')
+else:
+    qv = getquantizationvector(invenc, args.nbits - 1)  # -1 because of the sign bit
+    iemq = quantizeIEM(invenc, qv)
+    coefs = compressPCA_qvec(data, iemq)
+
+if args.save_packed:
+    try:
+        cfg = fitconfig(loadconfig(args.config), data_shape_orig)
+    except ValueError as e:
+        print(f'{args.config}: {e}')
+        sys.exit(1)
+    redbw = calcsumbw(cfg)
+    save_packed(args.save_packed, coefs, redbw, qv, cfg)
+    print(f'saved {args.save_packed}: redbw={redbw} {packedframebytes(sprime, redbw)} bytes/frame')
+
+if args.out:
+    out = open_decodebuf(args.out, nframes, npixels, args.prec)
+else:
+    out = np.empty((nframes, npixels), dtype=args.prec)
+
+st = time.perf_counter()
+decodePCA(coefs, redenc, qv, out=out, prec=args.prec, tile=args.tile)
+elapsed = time.perf_counter() - st
+
+if args.out:
+    out.flush()
+
+rmse = np.sqrt(np.mean((data - out)**2, axis=1))
+fps = nframes / elapsed
+
+print(f'frames={nframes} pixels={npixels} sprime={sprime} prec={args.prec} tile={args.tile}')
+print(f'decode: {elapsed:.4f} sec  {fps:.1f} frames/sec  {fps*npixels*np.dtype(args.prec).itemsize/1e9:.3f} GB/s')
+(rmean, rstd, rminv, rmaxv) = basic_stats(rmse)
+print(f'RMSE  : mean={rmean:.4f} std={rstd:.4f} min={rminv:.4f} max={rmaxv:.4f}')
+if fps >= args.fps:
+    print(f'keeps up with {args.fps:.1f} fps (x{fps/args.fps:.1f})')
+else:
+    print(f'falls behind {args.fps:.1f} fps (x{fps/args.fps:.2f})')
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# This code studies how to reduce the output bandwidth of the blocks.
+# Each block sends nmaxpcs*redbw bits per frame on io.out. The integer
+# coefficient streams of every block are computed from real frames and
+# the achieved bits per frame and the added RMSE are measured for:
+#
+#   fixed       : the redbw-wide words as sent today, and the observed
+#                 minimal width per PC (lossless)
+#   drop        : dropping k LSBs of every coefficient (rounded)
+#   drop/pc     : dropping LSBs per PC, sized so that each PC adds an
+#                 equal share of an error budget
+#   delta       : temporal delta against the previous frame, fixed width
+#   rice        : Rice coding (best k per stream) of values or deltas
+#   zlib        : deflate of the zigzag deltas
+#   entropy est : zeroth-order entropy of the deltas. With at most a
+#                 few thousand frames, most deltas are unique and the
+#                 plug-in entropy only reflects the frame count, so it is
+#                 taken on the deltas with k LSBs dropped (k per stream,
+#                 the smallest with at least 8 samples per distinct
+#                 value) plus k raw bits. An estimate, not a bound.
+#
+# This code requires the same data files as estimate_pcacomp_error_mem.py:
+#   image frame data : data/{basename}.npy
+#   encoding data    : data/{basename}-encoding.npy
+#
+# Usage: estimate_pcacomp_bandwidth.py [options] [config.json ...]
+#
+
+import argparse
+import zlib
+
+from pcacomp import *
+
+
+parser = argparse.ArgumentParser(description='Output bandwidth reduction study')
+parser.add_argument('configs', nargs='*', default=[DEFAULT_CONFIG],
+                    help='hardware configs (nblocks, pxbw, encbw); the frame geometry comes from the data')
+parser.add_argument('--sprime', type=int, default=25, help='number of principal components')
+parser.add_argument('--basename', default='data1small')
+parser.add_argument('--firstframe', type=int, default=0)
+parser.add_argument('--lastframe', type=int, default=1000, help='exclusive')
+parser.add_argument('--drops', default='1,2,4,6,8', help='LSBs to drop')
+parser.add_argument('--budgets', default='0.01,0.05,0.1', help='added MSE budgets for drop/pc, as a fraction')
+args = parser.parse_args()
+
+datafn = f'data/{args.basename}.npy'
+encfn  = f'data/{args.basename}-encoding.npy'
+
+(frames, data_shape_orig) = loadframes(datafn)
+x = np.asarray(frames[args.firstframe:args.lastframe], dtype=np.float64)
+(nframes, npixels) = x.shape
+(h, w) = data_shape_orig[1:]
+sprime = args.sprime
+enc = np.load(encfn)
+rem = enc[:sprime, :]
+inv = np.linalg.pinv(rem)
+
+
+def sbits(v):
+    v = np.asarray(v, dtype=np.int64)
+    mag = np.where(v >= 0, v, -v - 1)
+    return np.frexp(mag.astype(np.float64))[1] + 1
+
+def zigzag(v):
+    return (v << 1) ^ (v >> 63)
+
+def ricebits(u, maxk):
+    # total Rice code length per stream (axis 0 = frames), best k per stream
+    best = None
+    for k in range(0, maxk + 1):
+        bits = np.sum(u >> k, axis=0) + u.shape[0] * (1 + k)
+        best = bits if best is None else np.minimum(best, bits)
+    return np.sum(best)
+
+def entropybits(v, minsamples=8):
+    tot = 0.0
+    for s in v.reshape(v.shape[0], -1).T:
+        k = 0
+        while True:
+            (_, counts) = np.unique(s >> k, return_counts=True)
+            if len(counts) * minsamples <= len(s):
+                break
+            k += 1
+        p = counts / len(s)
+        tot -= np.sum(counts * np.log2(p))
+        tot += k * len(s)
+    return tot
+
+def delta(c):
+    d = c.copy()
+    d[1:] -= c[:-1]
+    return d
+
+def droplsb(c, k):
+    # round to nearest multiple of 2^k
+    k = np.asarray(k, dtype=np.int64)
+    half = np.where(k > 0, np.int64(1) << np.maximum(k - 1, 0), 0)
+    return ((c + half) >> k) << k
+
+
+for cfgfn in args.configs:
+    try:
+        cfg = fitconfig(loadconfig(cfgfn), data_shape_orig)
+    except ValueError as e:
+        print(f'{cfgfn}: {e}, skipped')
+        continue
+    nb = cfg['nblocks']
+    width = w // nb
+    redbw = calcredbw(cfg)
+    qv = np.asarray(getquantizationvector(inv, cfg['encbw'] - 1))  # -1 because of the sign bit
+    iemq = quantizeIEM(inv, qv).astype(np.float64)
+
+    # per-block integer streams (frames, nb, sprime), exact in float64
+    xb = x.reshape(nframes, h, nb, width).transpose(2, 0, 1, 3).reshape(nb, nframes, h * width)
+    qb = iemq.reshape(h, nb, width, sprime).transpose(1, 0, 2, 3).reshape(nb, h * width, sprime)
+    coefs = np.rint(np.matmul(xb, qb)).astype(np.int64).transpose(1, 0, 2)
+
+    def framemse(c):
+        approx = decodePCA(np.sum(c, axis=1), rem, qv, prec='float64')
+        return np.mean((x - approx)**2, axis=1)
+
+    def rmse(c):
+        return np.mean(np.sqrt(framemse(c)))
+
+    base_mse = framemse(coefs)
+    base = np.mean(np.sqrt(base_mse))
+    base_mse = np.mean(base_mse)
+    rows = []
+    def add(label, bits, err):
+        rows.append((label, bits / nframes, err))
+
+    add('fixed redbw', nb * sprime * redbw * nframes, base)
+    minw = sbits(np.stack([coefs.min(axis=0), coefs.max(axis=0)])).max(axis=0)
+    add('fixed observed', np.sum(minw) * nframes, base)
+
+    dc = delta(coefs)
+    # the first frame is sent at full width
+    add('delta fixed', nb * sprime * redbw + np.sum(sbits(np.stack([dc[1:].min(axis=0), dc[1:].max(axis=0)])).max(axis=0)) * (nframes - 1), base)
+    add('rice', ricebits(zigzag(coefs).reshape(nframes, -1), redbw), base)
+    add('delta+rice', ricebits(zigzag(dc).reshape(nframes, -1), redbw), base)
+    add('delta+zlib', len(zlib.compress(zigzag(dc).astype('<u8').tobytes(), 6)) * 8, base)
+    add('delta entropy est', entropybits(dc), base)
+
+    for k in [int(v) for v in args.drops.split(',')]:
+        if k >= redbw:
+            continue
+        ct = droplsb(coefs, k)
+        err = rmse(ct)
+        add(f'drop {k}', nb * sprime * (redbw - k) * nframes, err)
+        add(f'drop {k}+delta+rice', ricebits(zigzag(delta(ct >> k)).reshape(nframes, -1), redbw), err)
+
+    # per PC: nb blocks each add a uniform rounding error of step 2^k on
+    # coefficient s, i.e. nb * 4^k/12 * qv_s^2 * |rem_s|^2 / npixels per pixel
+    remnorm = np.sum(rem * rem, axis=1)
+    for f in [float(v) for v in args.budgets.split(',')]:
+        step = np.sqrt(12.0 * f * base_mse * npixels / (sprime * nb * qv**2 * remnorm))
+        k = np.clip(np.floor(np.log2(np.maximum(step, 1.0))), 0, redbw - 1).astype(np.int64)
+        ct = droplsb(coefs, k)
+        err = rmse(ct)
+        add(f'drop/pc {f:g}', nb * np.sum(redbw - k) * nframes, err)
+        add(f'drop/pc {f:g}+delta+rice', ricebits(zigzag(delta(ct >> k)).reshape(nframes, -1), redbw), err)
+
+    print(f'{cfgfn}: frames={nframes} h={h} w={w} nblocks={nb} sprime={sprime} '
+          f'encbw={cfg["encbw"]} pxbw={cfg["pxbw"]} redbw={redbw}')
+    print(f'  {"option":26s} {"bits/frame":>11s} {"ratio":>7s} {"RMSE":>8s} {"added":>8s}')
+    for (label, bits, err) in rows:
+        print(f'  {label:26s} {bits:11.1f} {rows[0][1]/bits:7.2f} {err:8.4f} {err - base:8.4f}')
+    print('')
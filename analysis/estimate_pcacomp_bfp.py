@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# This code evaluates a block floating point IEM. The width values of a
+# PC read together from one SRAM row share an expbw-bit exponent, so
+# each SRAM1RW word is width*encbw + expbw bits. The exponent is a
+# shift that the block applies before accumulation, which widens the
+# accumulator by up to 2^expbw - 1 bits.
+#
+# For each encbw and expbw, RMSE, the SRAM word width, the IEM memory
+# and the exponent overhead are reported, followed by the smallest
+# encbw per expbw that matches the accuracy of the per-PC scale
+# (expbw=0) at --refbw.
+#
+# This code requires the same data files as estimate_pcacomp_error_mem.py:
+#   image frame data : data/{basename}.npy
+#   encoding data    : data/{basename}-encoding.npy
+#
+# Usage: estimate_pcacomp_bfp.py [options]
+#
+
+import argparse
+
+from pcacomp import *
+
+
+parser = argparse.ArgumentParser(description='Block floating point IEM')
+parser.add_argument('--sprime', type=int, default=25, help='number of principal components')
+parser.add_argument('--basename', default='data1small')
+parser.add_argument('--nblocks', type=int, default=None, help='default: from --config')
+parser.add_argument('--config', default=DEFAULT_CONFIG, help='hardware config for nblocks')
+parser.add_argument('--firstframe', type=int, default=0)
+parser.add_argument('--lastframe', type=int, default=100, help='exclusive')
+parser.add_argument('--encbws', default='3,4,5,6,7,8', help='IEM bit widths including the sign bit')
+parser.add_argument('--expbws', default='0,1,2,3,4', help='exponent bits per SRAM word')
+parser.add_argument('--refbw', type=int, default=8, help='encbw of the reference (expbw=0)')
+args = parser.parse_args()
+
+datafn = f'data/{args.basename}.npy'
+encfn  = f'data/{args.basename}-encoding.npy'
+
+(frames, data_shape_orig) = loadframes(datafn)
+x = np.asarray(frames[args.firstframe:args.lastframe], dtype=np.float64)
+(h, w) = data_shape_orig[1:]
+nb = args.nblocks or loadconfig(args.config)['nblocks']
+if w % nb != 0:
+    print(f'w={w} is not divisible by nblocks={nb}')
+    sys.exit(1)
+width = w // nb
+blockgeom = (h, w, nb)
+sprime = args.sprime
+enc = np.load(encfn)
+rem = enc[:sprime, :]
+inv = np.linalg.pinv(rem)
+
+encbws = [int(v) for v in args.encbws.split(',')]
+expbws = [int(v) for v in args.expbws.split(',')]
+if args.refbw not in encbws:
+    encbws.append(args.refbw)
+if 0 not in expbws:
+    expbws.insert(0, 0)
+
+def memkb(encbw, expbw):
+    # one SRAM per PC and block, h words of width*encbw + expbw bits
+    return nb * sprime * h * (width * encbw + expbw) / 8 / 1024
+
+rmse = {}
+print(f'frames={x.shape[0]} shape=({h},{w}) nblocks={nb} width={width} sprime={sprime}')
+print('')
+print(f'encbw expbw  wordbw  IEM(KB)  exp%   accum+   RMSE mean  stddiv')
+for encbw in sorted(encbws):
+    for expbw in expbws:
+        nbits = encbw - 1  # -1 because of the sign bit
+        (mse, _) = evaluatePCA_bfp(x, rem, inv, nbits, expbw, blockgeom)
+        (tmpmean, tmpstd, tmpminv, tmpmaxv) = basic_stats(np.sqrt(mse))
+        rmse[(encbw, expbw)] = tmpmean
+        wordbw = width * encbw + expbw
+        print(f'{encbw:5d} {expbw:5d} {wordbw:7d} {memkb(encbw, expbw):8.2f} {expbw/wordbw:5.1%} '
+              f'{(1 << expbw) - 1:6d} {tmpmean:11.4f} {tmpstd:7.4f}')
+
+ref = rmse[(args.refbw, 0)]
+print('')
+print(f'reference: encbw={args.refbw} expbw=0 RMSE={ref:.4f} wordbw={width*args.refbw} IEM={memkb(args.refbw, 0):.2f}KB')
+for expbw in expbws:
+    ok = [e for e in sorted(encbws) if rmse[(e, expbw)] <= ref]
+    if not ok:
+        print(f'  expbw={expbw}: no encbw reaches the reference')
+        continue
+    e = ok[0]
+    print(f'  expbw={expbw}: encbw={e} RMSE={rmse[(e, expbw)]:.4f} wordbw={width*e + expbw} '
+          f'IEM={memkb(e, expbw):.2f}KB ({memkb(e, expbw)/memkb(args.refbw, 0) - 1.0:+.1%} memory)')
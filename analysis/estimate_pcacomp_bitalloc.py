@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# This code searches a per-PC bit width allocation for the quantized
+# IEM. Each PC has its own SRAM in PCACompBlock, so its entries can be
+# narrower than the uniform nbits. Each PC is scaled by its largest
+# magnitude, so its values fit its signed width, also for the
+# one-signed PC of the mean. The allocation is grown greedily,
+# giving bits to the PC with the largest error reduction per bit
+# (looking a few bits ahead), until the RMSE target is met (by default
+# the RMSE of the uniform nbits) or the memory budget is used up. With
+# only --budget-kb, the RMSE is minimized within the budget instead.
+#
+# The error of a candidate is evaluated incrementally in coefficient
+# space: with G = rem rem^T and r = x rem^T, the squared error of the
+# reconstruction c rem is |x|^2 - 2 c.r + c G c^T, so changing the
+# bits of one PC only updates one coefficient per frame. The clip to
+# non-negative pixels is left out of this proxy, so once the search
+# meets the target, bits keep being added until the clipped RMSE (kept
+# up to date with rank-one updates of the reconstruction) meets it too.
+# Bits are then removed again, from that allocation and from the
+# uniform one, as long as the clipped RMSE meets the target,
+# and the smaller of the two is kept. A target that cannot be met is
+# reported.
+#
+# This code requires the same data files as estimate_pcacomp_error_mem.py:
+#   image frame data : data/{basename}.npy
+#   encoding data    : data/{basename}-encoding.npy
+#
+# Usage: estimate_pcacomp_bitalloc.py [options]
+#
+
+import argparse
+
+from pcacomp import *
+
+
+parser = argparse.ArgumentParser(description='Per-PC bit allocation for the quantized IEM')
+parser.add_argument('--sprime', type=int, default=25, help='number of principal components')
+parser.add_argument('--nbits', type=int, default=8, help='uniform IEM bit width including the sign bit')
+parser.add_argument('--basename', default='data1small')
+parser.add_argument('--firstframe', type=int, default=0)
+parser.add_argument('--lastframe', type=int, default=100, help='sample frames, exclusive')
+parser.add_argument('--minbits', type=int, default=2)
+parser.add_argument('--maxbits', type=int, default=16)
+parser.add_argument('--lookahead', type=int, default=3, help='bits to look ahead per PC')
+parser.add_argument('--budget-kb', type=float, default=None, help='IEM memory budget')
+parser.add_argument('--rmse', type=float, default=None, help='RMSE target (default: uniform nbits)')
+parser.add_argument('--json', default=None, help='save the allocation to this file')
+args = parser.parse_args()
+
+datafn = f'data/{args.basename}.npy'
+encfn  = f'data/{args.basename}-encoding.npy'
+
+(frames, data_shape_orig) = loadframes(datafn)
+x = np.asarray(frames[args.firstframe:args.lastframe], dtype=np.float64)
+(nframes, npixels) = x.shape
+sprime = args.sprime
+enc = np.load(encfn)
+rem = enc[:sprime, :]
+inv = np.linalg.pinv(rem)
+
+def memkb(bits):
+    return np.sum(bits) * npixels / 8 / 1024
+
+def evaluate(bits):
+    """Mean per-frame RMSE with the full evaluator."""
+    qv = getquantizationvector_sym_bits(inv, np.asarray(bits) - 1)  # -1 because of the sign bit
+    coefs = compressPCA_qvec(x, quantizeIEM(inv, qv))
+    approx = decodePCA(coefs, rem, qv, prec='float64')
+    return np.mean(np.sqrt(np.mean((x - approx)**2, axis=1)))
+
+# coefficients of every PC at every candidate width: C[b][f, s]
+bitrange = range(args.minbits, args.maxbits + 1)
+C = {}
+for b in bitrange:
+    qv = getquantizationvector_sym(inv, b - 1)
+    C[b] = compressPCA_qvec(x, quantizeIEM(inv, qv)) * np.asarray(qv)
+
+G = rem @ rem.T
+r = x @ rem.T
+xx = np.sum(x * x)
+
+def sse(c, Gc):
+    return xx - 2.0 * np.sum(c * r) + np.sum(Gc * c)
+
+uniform = [args.nbits] * sprime
+rmse_uniform = evaluate(uniform)
+budget = args.budget_kb if args.budget_kb is not None else np.inf
+# with only a budget, minimize the RMSE within it
+minimize = args.budget_kb is not None and args.rmse is None
+target = args.rmse if args.rmse is not None else rmse_uniform
+# the search works on the aggregate RMS, calibrate the target to it
+c = C[args.nbits].copy()
+rms_uniform = np.sqrt(sse(c, c @ G) / (nframes * npixels))
+rms_target = rms_uniform * target / rmse_uniform
+
+class Alloc:
+    """A bit allocation with its coefficients and proxy error."""
+
+    def __init__(self, bits):
+        self.bits = np.array(bits)
+        self.c = np.stack([C[b][:, s] for (s, b) in enumerate(self.bits)], axis=1)
+        self.Gc = self.c @ G
+        self.err = sse(self.c, self.Gc)
+        self.u = self.c @ rem  # reconstruction before the clip
+
+    def rmse(self):
+        """Mean per-frame RMSE with the clip, same as evaluate()."""
+        return np.mean(np.sqrt(np.mean((x - np.maximum(self.u, 0))**2, axis=1)))
+
+    def rms(self):
+        return np.sqrt(self.err / (nframes * npixels))
+
+    def move(self, s, k):
+        """(gain, k, s, delta) of changing the bits of PC s by k."""
+        delta = C[self.bits[s] + k][:, s] - self.c[:, s]
+        gain = 2.0 * delta @ r[:, s] - 2.0 * delta @ self.Gc[:, s] - G[s, s] * (delta @ delta)
+        return (gain, k, s, delta)
+
+    def apply(self, move):
+        (gain, k, s, delta) = move
+        self.bits[s] += k
+        self.c[:, s] += delta
+        self.Gc += np.outer(delta, G[s])
+        self.err -= gain
+        self.u += np.outer(delta, rem[s])
+
+    def undo(self, move):
+        (gain, k, s, delta) = move
+        self.apply((-gain, -k, s, -delta))
+
+    def bestadd(self):
+        """Move with the largest gain per added bit, or None."""
+        best = None
+        for s in range(sprime):
+            # truncation makes the error of a single PC non-monotonic in
+            # its bits, so look a few bits ahead and compare gain per bit
+            for k in range(1, args.lookahead + 1):
+                if self.bits[s] + k > args.maxbits or memkb(self.bits) + k * npixels / 8 / 1024 > budget:
+                    break
+                mv = self.move(s, k)
+                if best is None or mv[0] / k > best[0] / best[1]:
+                    best = mv
+        return best
+
+    def bestremove(self, frozen):
+        """Move with the smallest loss per removed bit, or None."""
+        best = None
+        for s in range(sprime):
+            if s in frozen:
+                continue
+            for k in range(1, args.lookahead + 1):
+                if self.bits[s] - k < args.minbits:
+                    break
+                mv = self.move(s, -k)
+                if best is None or -mv[0] / k < -best[0] / -best[1]:
+                    best = mv
+        return best
+
+
+def ascend(a):
+    """Add bits until the target is met (checked with the full evaluator)."""
+    while minimize or a.rms() > rms_target:
+        mv = a.bestadd()
+        if mv is None or (minimize and mv[0] <= 0):
+            break
+        a.apply(mv)
+    # the proxy has no clip, so keep adding bits until the full evaluator
+    # meets the target as well
+    rmse = a.rmse()
+    while not minimize and rmse > target:
+        mv = a.bestadd()
+        if mv is None:
+            break
+        a.apply(mv)
+        rmse = a.rmse()
+    return rmse
+
+def descend(a, rmse):
+    """Remove bits while the full evaluator still meets the target."""
+    frozen = set()
+    while True:
+        mv = a.bestremove(frozen)
+        if mv is None:
+            return rmse
+        a.apply(mv)
+        trial = a.rmse()
+        if trial > target:
+            a.undo(mv)
+            frozen.add(mv[2])
+        else:
+            rmse = trial
+
+st = time.perf_counter()
+a = Alloc(np.full(sprime, args.minbits))
+rmse_alloc = ascend(a)
+if not minimize:
+    # the greedy ascent can overshoot where the proxy is far from the
+    # clipped error, so also prune from the uniform allocation when it
+    # is a valid start and keep the cheaper result
+    cands = []
+    if rmse_alloc <= target:
+        cands.append((a, descend(a, rmse_alloc)))
+    if rmse_uniform <= target and memkb(uniform) <= budget:
+        u = Alloc(uniform)
+        cands.append((u, descend(u, rmse_uniform)))
+    if cands:
+        (a, rmse_alloc) = min(cands, key=lambda t: (memkb(t[0].bits), t[1]))
+bits = a.bits
+elapsed = time.perf_counter() - st
+rmse_alloc = evaluate(bits)
+met = minimize or rmse_alloc <= target
+
+print(f'frames={nframes} pixels={npixels} sprime={sprime} search={elapsed:.3f} sec')
+if minimize:
+    print(f'minimize RMSE within budget={budget:.1f}KB')
+else:
+    print(f'target RMSE={target:.4f}' + (f' budget={budget:.1f}KB' if np.isfinite(budget) else ''))
+print('')
+print(f'             RMSE    mem(KB)')
+print(f'uniform   {rmse_uniform:8.4f} {memkb(uniform):10.2f}   nbits={args.nbits}')
+print(f'allocated {rmse_alloc:8.4f} {memkb(bits):10.2f}   saved {memkb(uniform) - memkb(bits):.2f}KB '
+      f'({1.0 - memkb(bits)/memkb(uniform):.1%})')
+print('')
+print('bits per PC: ' + ' '.join(str(b) for b in bits))
+if not met:
+    limit = 'the memory budget' if np.isfinite(budget) else f'maxbits={args.maxbits}'
+    print('')
+    print(f'TARGET NOT MET: RMSE {rmse_alloc:.4f} > {target:.4f} within {limit}')
+
+if args.json:
+    with open(args.json, 'w') as f:
+        json.dump({'bits': [int(b) for b in bits],
+                   'qv': getquantizationvector_sym_bits(inv, bits - 1),
+                   'rmse': rmse_alloc, 'mem_kb': memkb(bits),
+                   'target_rmse': None if minimize else target, 'target_met': bool(met),
+                   'uniform_nbits': args.nbits, 'uniform_rmse': rmse_uniform,
+                   'uniform_mem_kb': memkb(uniform)}, f, indent=2)
+    print(f'saved {args.json}')
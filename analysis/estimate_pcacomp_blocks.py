@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# This code compares the global PCA basis with block-local bases, one
+# per column strip of width = w/nblocks as seen by each PCACompBlock
+# instance. For each strip it also searches the smallest number of PCs
+# whose strip error does not exceed the global basis error on the same
+# strip, and reports the IEM memory of each variant.
+#
+# This code requires:
+#   image frame data      : data/{basename}.npy
+#   global encoding data  : data/{basename}-encoding.npy
+#   per-strip encoding    : data/{basename}-encoding-nblocks{nblocks}.npy
+#
+# compute_pca_encoding.py [nblocks] generates the per-strip encoding.
+#
+# Usage: estimate_pcacomp_blocks.py [options]
+#
+
+import argparse
+
+from pcacomp import *
+
+
+parser = argparse.ArgumentParser(description='Block-local vs global PCA basis')
+parser.add_argument('--sprime', type=int, default=25, help='number of principal components')
+parser.add_argument('--nbits', type=int, default=8, help='IEM bit width including the sign bit')
+parser.add_argument('--basename', default='data1small')
+parser.add_argument('--nblocks', type=int, default=8)
+parser.add_argument('--firstframe', type=int, default=0)
+parser.add_argument('--lastframe', type=int, default=100, help='exclusive')
+parser.add_argument('--workers', type=int, default=None, help='parallel strips (default: nblocks)')
+args = parser.parse_args()
+
+datafn = f'data/{args.basename}.npy'
+encfn  = f'data/{args.basename}-encoding.npy'
+encbfn = f'data/{args.basename}-encoding-nblocks{args.nblocks}.npy'
+
+(frames, data_shape_orig) = loadframes(datafn)
+x = np.asarray(frames[args.firstframe:args.lastframe], dtype=np.float64)
+(nframes, npixels) = x.shape
+nb = args.nblocks
+sprime = args.sprime
+nbits = args.nbits - 1  # -1 because of the sign bit
+stripbits = npixels // nb
+
+def memkb(npcs):
+    # npcs per block, each PC an SRAM of nrows x width entries
+    return np.sum(npcs) * stripbits * args.nbits / 8 / 1024
+
+def stripmse(x, approx):
+    return np.stack([np.mean(d**2, axis=1) for d in splitstrips(x - approx, data_shape_orig, nb)])
+
+# global basis: every block holds all sprime PCs for its columns
+enc = np.load(encfn)
+rem = enc[:sprime, :]
+inv = np.linalg.pinv(rem)
+(mse_g, approx_g) = evaluatePCA_qvec_batch(x, rem, inv, getquantizationvector(inv, nbits))
+strip_g = stripmse(x, approx_g)
+
+st = time.perf_counter()
+# block-local bases with the same number of PCs
+(rems, iems) = loadencoding_blocks(sprime, encbfn)
+(mse_b, strip_b) = evaluatePCA_blocks(x, data_shape_orig, rems, iems, nbits, args.workers)
+
+# smallest number of PCs per strip that matches the global basis on the strip
+encb = np.load(encbfn)
+strips = splitstrips(x, data_shape_orig, nb)
+target = np.mean(strip_g, axis=1)
+def searchstrip(b):
+    for s in range(1, sprime + 1):
+        r = encb[b, :s, :]
+        i = np.linalg.pinv(r)
+        (mse, _) = evaluatePCA_qvec_batch(strips[b], r, i, getquantizationvector(i, nbits))
+        if np.mean(mse) <= target[b]:
+            return s
+    return sprime
+with ThreadPoolExecutor(max_workers=args.workers or nb) as ex:
+    npcs = list(ex.map(searchstrip, range(nb)))
+(rems, iems) = loadencoding_blocks(npcs, encbfn)
+(mse_m, strip_m) = evaluatePCA_blocks(x, data_shape_orig, rems, iems, nbits, args.workers)
+elapsed = time.perf_counter() - st
+
+print(f'frames={nframes} shape={data_shape_orig[1:]} nblocks={nb} sprime={sprime} nbits={args.nbits}  ({elapsed:.2f} sec)')
+print('')
+print(f'basis            PCs/block        RMSE mean  stddiv   IEM(KB)')
+def print_row(label, pcs, mse):
+    (tmpmean, tmpstd, tmpminv, tmpmaxv) = basic_stats(np.sqrt(mse))
+    pcslabel = str(pcs[0]) if len(set(pcs)) == 1 else ','.join(str(p) for p in pcs)
+    print(f'{label:16s} {pcslabel:16s} {tmpmean:9.4f} {tmpstd:7.4f} {memkb(pcs):9.2f}')
+print_row('global', [sprime] * nb, mse_g)
+print_row('block-local', [sprime] * nb, mse_b)
+print_row('block-local min', npcs, mse_m)
+print('')
+print('per strip RMSE    global  block-local  block-local min (PCs)')
+for b in range(nb):
+    print(f'  strip{b:<3d}   {np.mean(np.sqrt(strip_g[b])):9.4f} {np.mean(np.sqrt(strip_b[b])):12.4f} '
+          f'{np.mean(np.sqrt(strip_m[b])):12.4f} ({npcs[b]})')
+print('')
+print(f'IEM memory saved by block-local min: {memkb([sprime]*nb) - memkb(npcs):.2f}KB '
+      f'({1.0 - memkb(npcs)/memkb([sprime]*nb):.1%}), max PCs per block {max(npcs)} vs {sprime}')
@@ -14,8 +14,16 @@
 #
 # compute-pca-encoding.py can generate the encoding data from image frame
 #
-# Usage: evavalute-pca-comp.py [S] [basename]
+# Per-frame results are kept in a result store (pcaresults.py), by
+# default data/pcaresults.sqlite. Only the frames missing from the
+# store are computed. Set PCARESULTS to another file, or to 'none' to
+# disable the store.
+#
+# Usage: evavalute-pca-comp.py [S] [nbits] [basename] [lastframe] [f16block]
 # By default, S=1 and basneme='data1small'
+# f16 is the float16 matmul (float16 inputs, float32 accumulation).
+# f16block=1 adds f16block, the float16 datapath of the block with every
+# product and add rounded, which is slower than the matmul.
 #
 
 #from skimage.io import imread, imsave
@@ -31,6 +39,7 @@ from functools import reduce
 import struct
 
 from pcacomp import *
+from pcaresults import open_store
 
 g_basename='data1small'
 
@@ -46,6 +55,11 @@ if len(sys.argv) > 2:
     g_nbits = int(sys.argv[2]) - 1  # -1 because g_nbits doesn't include the sign bit
 if len(sys.argv) > 3:
     g_basename = sys.argv[3]
+if len(sys.argv) > 4:
+    g_lastframe = int(sys.argv[4])
+g_f16block = False
+if len(sys.argv) > 5:
+    g_f16block = int(sys.argv[5]) != 0
 
 g_datafn = f'data/{g_basename}.npy'
 g_encfn  = f'data/{g_basename}-encoding.npy'
@@ -69,37 +83,71 @@ g_quantized_d = getquantizationfactor(g_invenc, g_nbits)
 
 g_qvec = getquantizationvector(g_invenc, g_nbits)
 
+g_store = open_store()
+
 
 def evaluate_pca(data, fstart, fend, sprime, rem, iem, cr, w, h, nbits):
-    msef64array = []
-    msef32array = []
-    msef16array = []
-    msef16marray = []
-    mseqvarray = []
-    for fno in range(fstart, fend):
-        (msef64, recf64, difff64) = evaluatePCA(data[fno], rem, iem, sprime, 'float64', 'float64')
-        (msef32, recf32, difff32) = evaluatePCA(data[fno], rem, iem, sprime, 'float32', 'float32')
-        (msef16, recf16, difff16) = evaluatePCA(data[fno], rem, iem, sprime, 'float16', 'float16')
-        (msef16m, recf16m, difff16m ) = evaluatePCA_mixed(data[fno], rem, iem, sprime, 'int16', 'int32', 'float32', g_quantized_d)
-        (mseqv, recqv, diffqv) = evaluatePCA_qvec(data[fno], rem, iem, sprime, 'int16', 'int32', 'float32', g_qvec)
-        #print(f'fno{fno}: {msef64:.3f} {msef32:.3f} {msef16:.3f} {msef16m:.3} {mseqv:.3f}')
-        msef64array.append(msef64)
-        msef32array.append(msef32)
-        msef16array.append(msef16)
-        msef16marray.append(msef16m)
-        mseqvarray.append(mseqv)
-        if (fno == 0):
-            def genpng(fn, a):
-                plt.imshow(a)
-                plt.colorbar()
-                plt.savefig(fn)
-                plt.clf()
-            genpng(f'png/s{sprime}-fno{fno}-orig.png', data[fno].reshape(w,h))
-            genpng(f'png/s{sprime}-fno{fno}-recf64.png', recf64.reshape(w,h))
-            genpng(f'png/s{sprime}-fno{fno}-recf32.png', recf32.reshape(w,h))
-            genpng(f'png/s{sprime}-fno{fno}-recf16.png', recf16.reshape(w,h))
-            genpng(f'png/s{sprime}-fno{fno}-recf16m.png', recf16m.reshape(w,h))
-            genpng(f'png/s{sprime}-fno{fno}-recqvec.png', recqv.reshape(w,h))
+    def perframe(evaluator):
+        def run(frames):
+            res = [evaluator(d) for d in frames]
+            return (np.array([r[0] for r in res]), np.array([r[1].ravel() for r in res]))
+        return run
+
+    # every evaluator maps frames (n, npixels) to (mse per frame, reconstructed frames)
+    evaluators = {
+        'f64': ('recf64', perframe(lambda d: evaluatePCA(d, rem, iem, sprime, 'float64', 'float64'))),
+        'f32': ('recf32', perframe(lambda d: evaluatePCA(d, rem, iem, sprime, 'float32', 'float32'))),
+        # same as the float16 matmul, float16 inputs and result with float32 accumulation
+        'f16': ('recf16', lambda d: evaluatePCA_fp_batch(d, rem, iem, 'float16')),
+        'int': ('recf16m', perframe(lambda d: evaluatePCA_mixed(d, rem, iem, sprime, 'int16', 'int32', 'float32', g_quantized_d))),
+        'int_quantized': ('recqvec', perframe(lambda d: evaluatePCA_qvec(d, rem, iem, sprime, 'int16', 'int32', 'float32', g_qvec))),
+    }
+    if g_f16block:
+        # float16 inputs, products and sums, left-to-right row reduction as in the block
+        evaluators['f16block'] = ('recf16block', lambda d: evaluatePCA_fp_batch(
+            d, rem, iem, 'float16', roundat=('input', 'product', 'sum'), order='sequential', blockgeom=(w, h, 1)))
+
+    quantized = ('int', 'int_quantized')
+    emulation = {'f16': 'matmul', 'f16block': 'sequential'}
+
+    def genpng(fn, a):
+        plt.imshow(a)
+        plt.colorbar()
+        plt.savefig(fn)
+        plt.clf()
+
+    fnos = list(range(fstart, fend))
+    msearrays = {}
+    for (label, (pngname, evaluator)) in evaluators.items():
+        # only the frames that are not in the result store are computed
+        key = None
+        results = {}
+        if g_store is not None:
+            # the floating point modes do not quantize the IEM, so nbits is not part of their key
+            key = g_store.pointkey(g_datafn, g_encfn, label, sprime, nbits+1 if label in quantized else None,
+                                   **({'emulation': emulation[label]} if label in emulation else {}))
+            results = g_store.get(key, fnos)
+        missing = [fno for fno in fnos if fno not in results]
+        computed = {}
+        if missing:
+            (mse, rec) = evaluator(np.asarray([data[fno] for fno in missing]))
+            computed = dict(zip(missing, mse.tolist()))
+            if missing[0] == 0:
+                genpng(f'png/s{sprime}-fno0-{pngname}.png', rec[0].reshape(w,h))
+        results.update(computed)
+        msearrays[label] = [results[fno] for fno in fnos]
+        if g_store is not None:
+            g_store.put(key, computed)
+            g_store.put_aggregate(key, fstart, fend, msearrays[label])
+        if g_verbose:
+            print(f'{label}: {len(computed)} computed, {len(fnos) - len(computed)} from the result store')
+    if fstart == 0:
+        genpng(f'png/s{sprime}-fno0-orig.png', data[0].reshape(w,h))
+
+    msef32array = msearrays['f32']
+    msef16array = msearrays['f16']
+    msef16marray = msearrays['int']
+    mseqvarray = msearrays['int_quantized']
 
     print('')
     print(f'[stats] w={g_w} h={g_h} nbits={nbits+1} mem={(nbits+1)*sprime*w*h/8/1024}KB') # +1 because of the sign bit
@@ -112,6 +160,8 @@ def evaluate_pca(data, fstart, fend, sprime, rem, iem, cr, w, h, nbits):
 #    print_prec_stats(np.sqrt(msef64array),  'f64')
     print_prec_stats(np.sqrt(msef32array),  'f32')
     print_prec_stats(np.sqrt(msef16array),  'f16')
+    if g_f16block:
+        print_prec_stats(np.sqrt(msearrays['f16block']), 'f16block')
     print_prec_stats(np.sqrt(msef16marray), 'int')
     print_prec_stats(np.sqrt(mseqvarray),   'int_quantized')
 
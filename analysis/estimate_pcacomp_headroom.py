@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# This code measures the actual value ranges inside PCACompBlock when
+# the quantized IEM is applied to real frames, and recommends the
+# minimal widths for the multipliers, the per-row partial sums
+# (partialcompressed), the row accumulator (accbw) and the output
+# (redbw). PCACompBlock sizes them from worst-case bounds:
+#   mulbw = pxbw + iembw
+#   redbw = mulbw + log2Ceil(width) + log2Ceil(nrows)
+#   accbw = redbw + log2Ceil(nrows)
+#
+# The frames are streamed from a memory-mapped file in chunks, so the
+# data set does not have to fit in memory.
+#
+# This code requires the same data files as estimate_pcacomp_error_mem.py:
+#   image frame data : data/{basename}.npy
+#   encoding data    : data/{basename}-encoding.npy
+#
+# Usage: estimate_pcacomp_headroom.py [options]
+#
+
+import argparse
+
+from pcacomp import *
+
+
+parser = argparse.ArgumentParser(description='Accumulator headroom analyzer')
+parser.add_argument('--sprime', type=int, default=25, help='number of principal components')
+parser.add_argument('--nbits', type=int, default=8, help='IEM bit width including the sign bit (encbw)')
+parser.add_argument('--basename', default='data1small')
+parser.add_argument('--nblocks', type=int, default=1, help='column strips of the block')
+parser.add_argument('--pxbw', type=int, default=None, help='pixel bit width (default: from the data)')
+parser.add_argument('--margin', type=float, default=0.25, help='headroom on the observed extremes, as a fraction')
+parser.add_argument('--ncandidates', type=int, default=4, help='narrower widths to report overflow rates for')
+parser.add_argument('--chunk', type=int, default=256, help='frames per chunk')
+parser.add_argument('--json', default=None, help='save the recommendation to this file')
+args = parser.parse_args()
+
+datafn = f'data/{args.basename}.npy'
+encfn  = f'data/{args.basename}-encoding.npy'
+
+(frames, data_shape_orig) = loadframes(datafn)
+(nframes, npixels) = frames.shape
+h = data_shape_orig[1]
+w = data_shape_orig[2]
+nb = args.nblocks
+if w % nb != 0:
+    print(f'w={w} is not divisible by nblocks={nb}')
+    sys.exit(1)
+width = w // nb
+sprime = args.sprime
+
+enc = np.load(encfn)
+invenc = np.linalg.pinv(enc[:sprime, :])
+qv = getquantizationvector(invenc, args.nbits - 1)  # -1 because of the sign bit
+iemq = quantizeIEM(invenc, qv).astype(np.int64)
+# iem per (row, block): (h, nb, width, sprime). float64 is exact for these sums
+iemblk = iemq.reshape(h, nb, width, sprime).astype(np.float64)
+
+
+def sbits(v):
+    """Signed two's complement bits needed for each value."""
+    v = np.asarray(v, dtype=np.int64)
+    mag = np.where(v >= 0, v, -v - 1)
+    return np.frexp(mag.astype(np.float64))[1] + 1
+
+MAXBW = 64
+def hist_add(hist, v):
+    # hist[(block,) pc, bits] += 1, v is (..., nb, sprime)
+    b = sbits(v).reshape(-1, nb * sprime)
+    idx = b + np.arange(nb * sprime) * (MAXBW + 1)
+    hist += np.bincount(idx.ravel(), minlength=nb * sprime * (MAXBW + 1)).reshape(nb, sprime, MAXBW + 1)
+
+mulmin = np.full(sprime, np.iinfo(np.int64).max)
+mulmax = np.full(sprime, np.iinfo(np.int64).min)
+ext = {}
+hist = {}
+for k in ('partial', 'acc', 'out'):
+    ext[k] = [np.full((nb, sprime), np.iinfo(np.int64).max), np.full((nb, sprime), np.iinfo(np.int64).min)]
+    hist[k] = np.zeros((nb, sprime, MAXBW + 1), dtype=np.int64)
+pxmax = 0
+
+st = time.perf_counter()
+for start in range(0, nframes, args.chunk):
+    end = min(start + args.chunk, nframes)
+    blk = np.asarray(frames[start:end]).astype(np.int64)
+    pxmax = max(pxmax, int(blk.max()))
+
+    # multiplier outputs: the extremes of px*iem come from the extreme pixels
+    xmax = blk.max(axis=0)[:, None]
+    xmin = blk.min(axis=0)[:, None]
+    mulmax = np.maximum(mulmax, np.maximum(xmax * iemq, xmin * iemq).max(axis=0))
+    mulmin = np.minimum(mulmin, np.minimum(xmax * iemq, xmin * iemq).min(axis=0))
+
+    # per-row partial sums: (h, nb, F, sprime)
+    x = blk.reshape(end - start, h, nb, width).transpose(1, 2, 0, 3).astype(np.float64)
+    partial = np.rint(np.matmul(x, iemblk)).astype(np.int64).transpose(2, 0, 1, 3)  # (F, h, nb, sprime)
+    acc = np.cumsum(partial, axis=1)
+    out = acc[:, -1]
+
+    for (k, v) in (('partial', partial), ('acc', acc), ('out', out)):
+        v = v.reshape(-1, nb, sprime)
+        ext[k][0] = np.minimum(ext[k][0], v.min(axis=0))
+        ext[k][1] = np.maximum(ext[k][1], v.max(axis=0))
+        hist_add(hist[k], v)
+elapsed = time.perf_counter() - st
+
+
+def withmargin(lo, hi):
+    return sbits([int(m.floor(lo * (1.0 + args.margin))), int(m.ceil(hi * (1.0 + args.margin)))]).max()
+
+pxbw = args.pxbw if args.pxbw else max(1, int(pxmax).bit_length())
+hwcfg = {'w': w, 'h': h, 'pxbw': pxbw, 'encbw': args.nbits, 'nblocks': nb}
+hw = {'mulbw': pxbw + args.nbits, 'redbw': calcredbw(hwcfg)}
+hw['accbw'] = hw['redbw'] + log2ceil(h)
+hw['partial'] = hw['redbw']  # partialcompressed is declared redbw wide
+
+rec = {'mulbw': int(withmargin(mulmin.min(), mulmax.max())),
+       'partial': int(withmargin(ext['partial'][0].min(), ext['partial'][1].max())),
+       'accbw': int(withmargin(ext['acc'][0].min(), ext['acc'][1].max())),
+       'out': int(withmargin(ext['out'][0].min(), ext['out'][1].max()))}
+# partialcompressed and the output share redbw
+rec['redbw'] = max(rec['partial'], rec['out'])
+
+print(f'frames={nframes} h={h} w={w} nblocks={nb} width={width} sprime={sprime} '
+      f'pxbw={pxbw} encbw={args.nbits} margin={args.margin}  ({elapsed:.2f} sec)')
+print('')
+print(f'                hardware  observed  recommended')
+print(f'mulbw           {hw["mulbw"]:8d}  {int(sbits([mulmin.min(), mulmax.max()]).max()):8d}  {rec["mulbw"]:11d}')
+print(f'partial(redbw)  {hw["partial"]:8d}  {int(sbits([ext["partial"][0].min(), ext["partial"][1].max()]).max()):8d}  {rec["partial"]:11d}')
+print(f'accbw           {hw["accbw"]:8d}  {int(sbits([ext["acc"][0].min(), ext["acc"][1].max()]).max()):8d}  {rec["accbw"]:11d}')
+print(f'out(redbw)      {hw["redbw"]:8d}  {int(sbits([ext["out"][0].min(), ext["out"][1].max()]).max()):8d}  {rec["out"]:11d}')
+print(f'io.out          {sprime*hw["redbw"]:8d}  {"":8s}  {sprime*rec["redbw"]:11d}  bits per block per frame')
+
+print('')
+print('per PC (over all blocks): out min/max and bits')
+for pc in range(sprime):
+    lo = ext['out'][0][:, pc].min()
+    hi = ext['out'][1][:, pc].max()
+    print(f'  pc{pc:<4d} {lo:14d} {hi:14d}  {int(sbits([lo, hi]).max()):3d}  acc {int(sbits([ext["acc"][0][:, pc].min(), ext["acc"][1][:, pc].max()]).max()):3d}')
+
+if nb > 1:
+    print('')
+    print('per block (over all PCs): out min/max and bits')
+    for b in range(nb):
+        lo = ext['out'][0][b].min()
+        hi = ext['out'][1][b].max()
+        print(f'  block{b:<3d} {lo:14d} {hi:14d}  {int(sbits([lo, hi]).max()):3d}')
+
+print('')
+print('overflow rate under narrower widths')
+print(f'    bw      partial          acc          out')
+def overflow(k, bw):
+    hk = hist[k].sum(axis=(0, 1))
+    return hk[bw + 1:].sum() / hk.sum()
+for bw in range(rec['redbw'] - args.ncandidates, max(rec['redbw'], rec['accbw']) + 1):
+    if bw < 1:
+        continue
+    print(f'  {bw:4d}  {overflow("partial", bw):11.3e}  {overflow("acc", bw):11.3e}  {overflow("out", bw):11.3e}')
+
+if args.json:
+    with open(args.json, 'w') as f:
+        json.dump({'hardware': hw, 'recommended': rec, 'margin': args.margin,
+                   'config': hwcfg, 'sprime': sprime, 'nframes': nframes}, f, indent=2)
+    print(f'saved {args.json}')
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# This code evaluates PCA compression with the sparse projection path
+# (evaluatePCA_sparse in pcacomp.py) on mostly-zero detector frames and
+# reports the achieved pixel density, the accuracy against the dense
+# path, and how many multiplies and row cycles a zero-skipping block
+# could skip.
+#
+# This code requires the same data files as estimate_pcacomp_error_mem.py:
+#   image frame data : data/{basename}.npy
+#   encoding data    : data/{basename}-encoding.npy
+#
+# Usage: estimate_pcacomp_sparse.py [options]
+#
+
+import argparse
+
+from pcacomp import *
+
+
+parser = argparse.ArgumentParser(description='Sparse-frame PCA projection')
+parser.add_argument('--sprime', type=int, default=25, help='number of principal components')
+parser.add_argument('--nbits', type=int, default=8, help='IEM bit width including the sign bit')
+parser.add_argument('--basename', default='data1small')
+parser.add_argument('--firstframe', type=int, default=0)
+parser.add_argument('--lastframe', type=int, default=None, help='exclusive')
+parser.add_argument('--nblocks', type=int, default=1, help='column strips of the block')
+parser.add_argument('--threshold', type=float, default=0.25, help='frame density above which a frame goes dense')
+parser.add_argument('--chunk', type=int, default=64, help='frames per chunk')
+args = parser.parse_args()
+
+datafn = f'data/{args.basename}.npy'
+encfn  = f'data/{args.basename}-encoding.npy'
+
+(frames, data_shape_orig) = loadframes(datafn)
+frames = frames[args.firstframe:args.lastframe]
+enc = np.load(encfn)
+redenc = enc[:args.sprime, :]
+invenc = np.linalg.pinv(redenc)
+qv = getquantizationvector(invenc, args.nbits - 1)  # -1 because of the sign bit
+
+h = data_shape_orig[1]
+w = data_shape_orig[2]
+if w % args.nblocks != 0:
+    print(f'w={w} is not divisible by nblocks={args.nblocks}')
+    sys.exit(1)
+
+st = time.perf_counter()
+(mse, density, stats) = evaluatePCA_sparse(frames, redenc, invenc, qv,
+                                           args.threshold, args.chunk, (h, w, args.nblocks))
+t_sparse = time.perf_counter() - st
+
+st = time.perf_counter()
+(mse_dense, _, _) = evaluatePCA_sparse(frames, redenc, invenc, qv, -1.0, args.chunk)
+t_dense = time.perf_counter() - st
+
+print(f'frames={len(frames)} h={h} w={w} nblocks={args.nblocks} sprime={args.sprime} nbits={args.nbits}')
+print(f'frames: sparse={stats["sparse_frames"]} dense={stats["dense_frames"]} (threshold={args.threshold})')
+
+def print_stats(d, label):
+    (tmpmean, tmpstd, tmpminv, tmpmaxv) = basic_stats(d)
+    print(f"{label:13s} {tmpmean:.4f} {tmpstd:.4f} {tmpminv:.4f} {tmpmaxv:.4f}")
+
+print(f"              mean   stddiv   min   max")
+print_stats(density, 'density')
+print_stats(np.sqrt(mse), 'RMSE sparse')
+print_stats(np.sqrt(mse_dense), 'RMSE dense')
+print('')
+print(f'time: sparse={t_sparse:.4f} sec  dense={t_dense:.4f} sec  (x{t_dense/t_sparse:.2f})')
+print(f'multiplies: dense={stats["mults_dense"]} done={stats["mults_done"]} nonzero={stats["mults_nonzero"]}')
+print(f'hardware: {1.0 - stats["mults_nonzero"]/stats["mults_dense"]:.2%} of the multiplies have a zero pixel')
+print(f'hardware: {stats["zero_segments"]}/{stats["segments"]} '
+      f'({stats["zero_segments"]/stats["segments"]:.2%}) block row cycles have an all-zero row segment')
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# This code exports the quantized IEM as SRAM preload images, one
+# $readmemh file per block and PC (SRAM1RW instance):
+#
+#   {outdir}/{basename}_block{b}_pc{s}.hex
+#
+# Each file has h lines, the iemdata word of each row. PCs beyond
+# --sprime up to the config m are written as zeros. Pass the block
+# prefix {outdir}/{basename}_block{b} to PCACompBlock(preload = ...) or
+# simulate.py --preload to skip the updateIEM upload in simulation.
+#
+# This code requires:
+#   encoding data    : data/{basename}-encoding.npy
+#
+# Usage: export_iem_hex.py [options]
+#
+
+import argparse
+
+from pcacomp import *
+
+
+parser = argparse.ArgumentParser(description='Export the quantized IEM as SRAM preload images')
+parser.add_argument('--config', default=DEFAULT_CONFIG, help='hardware config (w, h, m, encbw, nblocks)')
+parser.add_argument('--sprime', type=int, default=None, help='number of principal components (default: m)')
+parser.add_argument('--basename', default='data1small')
+parser.add_argument('--outdir', default='generated/preload')
+args = parser.parse_args()
+
+cfg = loadconfig(args.config)
+sprime = args.sprime or cfg['m']
+if sprime > cfg['m']:
+    print(f'sprime={sprime} exceeds m={cfg["m"]}')
+    sys.exit(1)
+
+encfn = f'data/{args.basename}-encoding.npy'
+enc = np.load(encfn)
+if enc.shape[1] != cfg['w'] * cfg['h']:
+    print(f'{encfn}: {enc.shape[1]} pixels do not match w*h={cfg["w"]*cfg["h"]} of {args.config}')
+    sys.exit(1)
+rem = enc[:sprime, :]
+inv = np.linalg.pinv(rem)
+# the SRAM words hold signed encbw-bit values, so the scale is set by
+# the largest magnitude of each PC rather than by its range
+qv = getquantizationvector_sym(inv, cfg['encbw'] - 1)  # -1 because of the sign bit
+iemq = quantizeIEM(inv, qv)
+
+os.makedirs(args.outdir, exist_ok=True)
+blockgeom = (cfg['h'], cfg['w'], cfg['nblocks'])
+prefixes = save_iemhex(f'{args.outdir}/{args.basename}', iemq, cfg['encbw'], blockgeom, cfg['m'])
+width = cfg['w'] // cfg['nblocks']
+print(f'{len(prefixes)} blocks x {cfg["m"]} PCs, depth{cfg["h"]}_width{width*cfg["encbw"]}, sprime={sprime}')
+for p in prefixes:
+    print(f'  {p}_pc*.hex')
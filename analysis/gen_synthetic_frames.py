@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# Seeded generator of synthetic detector frames for offline benchmarks.
+#
+# Each frame is Poisson counts of a low-rank rate image:
+#
+#   rate(t) = mean + sum_j a_j(t) * sigma_j * basis_j
+#
+# The mean is a flat background with a few Gaussian peaks, basis_j are
+# smooth orthonormal patterns and sigma_j decays geometrically, so the
+# leading PCs carry most of the variance like real data. Counts are
+# clipped to 2^pxbw - 1 and stored as uint16 (nframes, h, w).
+#
+# Frames are streamed in chunks into a memory-mapped .npy, so the
+# output can be far larger than memory. Chunks are generated on a
+# thread pool. Each frame draws from its own SeedSequence child, keyed
+# by the frame index, so the output only depends on --seed and the
+# geometry options, not on --chunk or --workers. rng.poisson dominates
+# the cost, about 25MB/s on one core at 192x168; how far it scales with
+# --workers has not been measured.
+#
+# Output, usable as --basename for the analysis scripts:
+#   image frame data : data/{basename}.npy
+#   encoding data    : data/{basename}-encoding.npy  (rank+1, h*w), the
+#                      normalized mean followed by the basis
+#
+# Usage: gen_synthetic_frames.py [options]
+#
+
+import argparse
+import os
+import time
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+def smooth_basis(rng, h, w, rank, maxfreq=6):
+    """rank orthonormal smooth patterns as (rank, h*w)."""
+    yy = np.linspace(0, 1, h)[:, None]
+    xx = np.linspace(0, 1, w)[None, :]
+    pats = np.empty((h * w, rank))
+    for j in range(rank):
+        (fy, fx) = rng.uniform(0, maxfreq, 2)
+        (py, px) = rng.uniform(0, 2 * np.pi, 2)
+        (cy, cx) = rng.uniform(0, 1, 2)
+        env = np.exp(-((yy - cy)**2 + (xx - cx)**2) / (2 * rng.uniform(0.1, 0.5)**2))
+        pats[:, j] = (env * np.cos(2 * np.pi * fy * yy + py) * np.cos(2 * np.pi * fx * xx + px)).ravel()
+    (q, _) = np.linalg.qr(pats)
+    return q.T
+
+
+def mean_image(rng, h, w, background, npeaks, peak):
+    yy = np.arange(h)[:, None]
+    xx = np.arange(w)[None, :]
+    img = np.full((h, w), float(background))
+    for _ in range(npeaks):
+        (cy, cx) = rng.uniform(0, h), rng.uniform(0, w)
+        s = rng.uniform(0.02, 0.1) * max(h, w)
+        img += peak * rng.uniform(0.2, 1.0) * np.exp(-((yy - cy)**2 + (xx - cx)**2) / (2 * s * s))
+    return img.ravel()
+
+
+def frameseed(seed, fno):
+    # same as SeedSequence(seed).spawn(2)[1].spawn(fno + 1)[fno]
+    return np.random.SeedSequence(seed, spawn_key=(1, fno))
+
+
+def generate_chunk(out, start, end, seed, mean, basis, sigma, maxval):
+    rngs = [np.random.default_rng(frameseed(seed, f)) for f in range(start, end)]
+    a = np.stack([rng.standard_normal(len(sigma)) for rng in rngs]) * sigma
+    rate = np.matmul(a, basis)
+    rate += mean
+    np.maximum(rate, 0, out=rate)
+    counts = np.stack([rng.poisson(r) for (rng, r) in zip(rngs, rate)])
+    np.minimum(counts, maxval, out=counts)
+    out[start:end] = counts.reshape(end - start, *out.shape[1:])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Synthetic low-rank-plus-Poisson detector frames')
+    parser.add_argument('--basename', default='synth')
+    parser.add_argument('--dpath', default='data')
+    parser.add_argument('--nframes', type=int, default=10000)
+    parser.add_argument('--h', type=int, default=192, help='rows')
+    parser.add_argument('--w', type=int, default=168, help='columns')
+    parser.add_argument('--rank', type=int, default=64, help='rank of the rate images')
+    parser.add_argument('--decay', type=float, default=0.9, help='sigma_j = amplitude * decay^j')
+    parser.add_argument('--amplitude', type=float, default=None,
+                        help='sigma_0 in counts (default: 4 * peak * sqrt(h*w) / rank)')
+    parser.add_argument('--background', type=float, default=5.0, help='mean counts of the background')
+    parser.add_argument('--npeaks', type=int, default=8)
+    parser.add_argument('--peak', type=float, default=200.0, help='mean counts at the top of a peak')
+    parser.add_argument('--pxbw', type=int, default=12, help='pixel bit width, counts are clipped to 2^pxbw-1')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=256, help='frames per chunk')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    (h, w, rank) = (args.h, args.w, args.rank)
+    if rank > h * w:
+        parser.error(f'rank={rank} exceeds h*w={h*w}')
+    ss = np.random.SeedSequence(args.seed)
+    (geomseed, _) = ss.spawn(2)  # the second child seeds the frames
+    rng = np.random.default_rng(geomseed)
+    basis = smooth_basis(rng, h, w, rank)
+    mean = mean_image(rng, h, w, args.background, args.npeaks, args.peak)
+    amplitude = args.amplitude if args.amplitude is not None else 4 * args.peak * np.sqrt(h * w) / rank
+    sigma = amplitude * args.decay ** np.arange(rank)
+
+    datafn = f'{args.dpath}/{args.basename}.npy'
+    encfn  = f'{args.dpath}/{args.basename}-encoding.npy'
+    nbytes = args.nframes * h * w * 2
+    print(f'{datafn}: nframes={args.nframes} shape=({h},{w}) rank={rank} {nbytes/2**30:.2f}GB')
+
+    st = time.perf_counter()
+    out = np.lib.format.open_memmap(datafn, mode='w+', dtype=np.uint16, shape=(args.nframes, h, w))
+    starts = range(0, args.nframes, args.chunk)
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        futs = [ex.submit(generate_chunk, out, s, min(s + args.chunk, args.nframes), args.seed,
+                          mean, basis, sigma, (1 << args.pxbw) - 1)
+                for s in starts]
+        for f in futs:
+            f.result()
+    out.flush()
+    del out
+    elapsed = time.perf_counter() - st
+    print(f'{elapsed:.2f} sec ({nbytes/2**20/elapsed:.1f}MB/s)')
+
+    # like compute_pca_encoding.py, the leading row spans the mean image
+    (q, _) = np.linalg.qr(np.concatenate([mean[:, None], basis.T], axis=1))
+    enc = q.T
+    np.save(encfn, enc)
+    print(f'{encfn}: shape={enc.shape}')
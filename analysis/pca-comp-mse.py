@@ -17,6 +17,8 @@ import sys, os, time
 from ctypes import *
 from functools import reduce
 
+from pcacomp import projectPCA_fp
+
 datafn = 'data/sampleimages.npz'
 #datafn = 'data/crop_data1.npz'
 
@@ -108,11 +110,17 @@ def loadfiles(sprime):
 
 (data, rem, iem) = loadfiles(S)
 
+def matmul_prec(data, invsprime):
+    # float16 matmul has no BLAS in NumPy; the same with a float32 GEMM
+    if data.dtype == np.float16 or invsprime.dtype == np.float16:
+        return projectPCA_fp(data, invsprime, 'float16')
+    return np.matmul(data, invsprime)
+
 def evaluatePCA(d, rem, iem, sprime, dataprec, invprec):
     data = np.array([d]).astype(dataprec)
     invsprime = iem[:, :sprime].astype(invprec)
     # print(f"{data.shape} {invsprime.shape}")
-    weighting_matrix = np.matmul(data, invsprime)
+    weighting_matrix = matmul_prec(data, invsprime)
     # recovery always back to float64
     data_approx = np.matmul(weighting_matrix, rem, dtype=np.float64)
     data_approx = np.clip(data_approx, 0, np.inf)
@@ -126,7 +134,7 @@ def evaluatePCA_f16trick(d, rem, iem, sprime):
     data = np.array([d]).astype('float32')
     invsprime = iem[:, :sprime].astype('float32')
     # print(f"{data.shape} {invsprime.shape}")
-    weighting_matrix = np.matmul(data, invsprime)
+    weighting_matrix = matmul_prec(data, invsprime)
     # recovery always back to float64
     data_approx = np.matmul(weighting_matrix, rem, dtype=np.float64)
     data_approx = np.clip(data_approx, 0, np.inf)
@@ -140,7 +148,7 @@ def evaluatePCA_scaling(d, rem, iem, sprime, dataprec, invprec, scaling=1):
     #print(np.max(np.abs(tmp)), np.min(np.abs(tmp)))
     invsprime = tmp
     # print(f"{data.shape} {invsprime.shape}")
-    weighting_matrix = np.matmul(data, invsprime)
+    weighting_matrix = matmul_prec(data, invsprime)
     weighting_matrix /= scaling
     # recovery always back to float64
     data_approx = np.matmul(weighting_matrix, rem, dtype=np.float64)
@@ -17,6 +17,8 @@ from functools import reduce
 
 import struct
 import copy
+import json
+from concurrent.futures import ThreadPoolExecutor
 
 def basic_stats(d):
     dmean = np.mean(d)
@@ -79,6 +81,21 @@ def getquantizationvector(inv, nbits=12):
         #print(f"c{i} ({invminv:.5e},{invmaxv:.5e}) => ({q_invminv}, {q_invmaxv}) d={d:.5e}")
     return qv
 
+def getquantizationvector_sym(inv, nbits=12):
+    """Per-column scale max|c|/(2^nbits - 1).
+
+    Unlike getquantizationvector(), which spreads the range of a column
+    over 2^nbits - 1 steps, every quantized value of an asymmetric column
+    stays within nbits plus the sign bit.
+    """
+    imax = (1<<nbits) - 1
+    return list(np.max(np.abs(inv), axis=0) / imax)
+
+def getquantizationvector_sym_bits(inv, nbitsvec):
+    """getquantizationvector_sym() with its own nbits for each column."""
+    imax = np.left_shift(1, np.asarray(nbitsvec, dtype=np.int64)) - 1
+    return list(np.max(np.abs(inv[:, :len(imax)]), axis=0) / imax)
+
 def loadfiles(sprime, datafn, encfn, verbose):
     """Load images and pre computed matrixes."""
 
@@ -131,8 +148,7 @@ def evaluatePCA(d, rem, iem, sprime, dataprec, invprec):
 
     weighting_matrix = np.matmul(data, invsprime)
     # recovery always back to float64
-    data_approx = np.matmul(weighting_matrix, rem, dtype=np.float64)
-    data_approx = np.clip(data_approx, 0, np.inf)
+    data_approx = decodePCA(weighting_matrix, rem, prec='float64')
     mse = np.sum((data - data_approx)**2) / (data.shape[1])
     #return (mse, data - data_approx)
     return (mse,  data_approx, data - data_approx)
@@ -153,8 +169,7 @@ def evaluatePCA_mixed(d, rem, iem, sprime, dataprec, invprec, redprec, qd):
     weighting_matrix *= qd
 
     # recovery always back to float64
-    data_approx = np.matmul(weighting_matrix, rem, dtype=np.float64)
-    data_approx = np.clip(data_approx, 0, np.inf)
+    data_approx = decodePCA(weighting_matrix, rem, prec='float64')
 
     mse = np.sum((data - data_approx)**2) / (data.shape[1])
     return (mse, data_approx, data - data_approx)
@@ -186,8 +201,7 @@ def evaluatePCA_qvec(d, rem, iem, sprime, dataprec, invprec, redprec, qv):
     for s in range(0, sprime):
         weighting_matrix[s] *= qv[s]
     # recovery always back to float64
-    data_approx = np.matmul(weighting_matrix, rem, dtype=np.float64)
-    data_approx = np.clip(data_approx, 0, np.inf)
+    data_approx = decodePCA(weighting_matrix, rem, prec='float64')
 
     if False:
         print(f"approx: {np.min(data_approx)}  {np.max(data_approx)}")
@@ -195,8 +209,630 @@ def evaluatePCA_qvec(d, rem, iem, sprime, dataprec, invprec, redprec, qv):
     return (mse, data_approx, data - data_approx)
 
 
+#
+# reduced-precision emulation
+#
+# NumPy has no BLAS for float16, so float16 matmul is much slower than
+# float32. NumPy's float16 matmul rounds the inputs, accumulates in
+# float32 and rounds the result once, so roundat=('input', 'output')
+# computes the same with one float32 GEMM (up to the float32 summation
+# order). Rounding at each product and each addition as well emulates a
+# float16 datapath like PCACompBlock. That mode is exact but not faster
+# than the float16 matmul, as the row reduction is a chain of rounded
+# adds. The sum of two float16 values is exact in float64, so rounding
+# after every add gives the float16 result.
+#
+
+def roundfp(x, fmt):
+    """Round to the nearest fmt value (ties to even), as float64."""
+    x = np.asarray(x)
+    if fmt == 'float16':
+        return x.astype(np.float16).astype(np.float64)
+    if fmt == 'bfloat16':
+        u = x.astype(np.float32).view(np.uint32)
+        u = (u + np.uint32(0x7fff) + ((u >> np.uint32(16)) & np.uint32(1))) & np.uint32(0xffff0000)
+        return u.view(np.float32).astype(np.float64)
+    return x.astype(fmt).astype(np.float64)
+
+
+def _projectPCA_f16(frames, iem, order, blockgeom, chunk):
+    # every product and sum of two float16 values is computed in float32
+    # and rounded once, which is the correctly rounded float16 result
+    # (24 >= 2*11+2 bits), so float16 arrays give the fully rounded
+    # emulation without the float64 round trips. The products are laid
+    # out with the position in the row first, so that each step of the
+    # row reduction adds contiguous arrays.
+    (nframes, npixels) = frames.shape
+    sprime = iem.shape[1]
+    (h, w, nblocks) = blockgeom
+    width = w // nblocks
+    b = iem.astype(np.float16).reshape(h, nblocks, width, sprime).transpose(2, 0, 1, 3)[:, None]
+    out = np.empty((nframes, sprime))
+    for start in range(0, nframes, chunk):
+        end = min(start + chunk, nframes)
+        x = frames[start:end].astype(np.float16).reshape(end - start, h, nblocks, width)
+        p = np.multiply(x.transpose(3, 0, 1, 2)[..., None], b)  # (width, n, h, nblocks, sprime)
+        if order == 'sequential':
+            acc = p[0].copy()
+            for i in range(1, width):
+                acc += p[i]
+        elif order == 'tree':
+            while p.shape[0] > 1:
+                k = p.shape[0]
+                pair = p[0:k - 1:2] + p[1:k:2]
+                p = np.concatenate((pair, p[k - 1:k])) if k % 2 else pair
+            acc = p[0]
+        else:
+            raise ValueError(f"projectPCA_fp: unknown order '{order}'")
+        # acc: (n, h, nblocks, sprime)
+        rows = acc[:, 0].copy()
+        for r in range(1, h):
+            rows += acc[:, r]
+        tot = rows[:, 0].copy()
+        for j in range(1, nblocks):
+            tot += rows[:, j]
+        out[start:end] = tot
+    return out
+
+
+def projectPCA_fp(frames, iem, fmt, roundat=('input', 'output'), order='sequential',
+                  blockgeom=None, chunk=32):
+    """Emulated reduced-precision projection, (nframes, sprime).
+
+    roundat selects where values are rounded to fmt: 'input', 'product',
+    'sum' and 'output'. Without 'product' and 'sum' the projection is one
+    float32 GEMM; the default matches the float16 matmul of NumPy.
+
+    With 'product' and 'sum' every operation of the block is rounded.
+    order is then the reduction order within a row of a block:
+    'sequential' (left to right, as the Seq.reduce in PCACompBlock) or
+    'tree' (balanced adder tree). Row sums are accumulated row by row
+    and the blocks are summed in order, like PCACompBlock.
+    blockgeom=(h, w, nblocks) gives the block layout of a frame; without
+    it the frame is a single row. float16 with 'input', 'product' and
+    'sum' runs on float16 arrays. Pass many frames at once, chunk frames
+    are processed together.
+    """
+    frames = np.atleast_2d(frames)
+    (nframes, npixels) = frames.shape
+    sprime = iem.shape[1]
+    (h, w, nblocks) = blockgeom if blockgeom is not None else (1, npixels, 1)
+    width = w // nblocks
+    if fmt == 'float16' and {'input', 'product', 'sum'} <= set(roundat):
+        return _projectPCA_f16(frames, iem, order, (h, w, nblocks), chunk)
+    if 'product' not in roundat and 'sum' not in roundat:
+        def in32(x):
+            x = np.asarray(x)
+            if 'input' not in roundat:
+                return x.astype(np.float32)
+            if fmt == 'float16':
+                # float16 to float32 is exact, no float64 round trip
+                return x.astype(np.float16, copy=False).astype(np.float32)
+            return roundfp(x, fmt).astype(np.float32)
+        p = np.matmul(in32(frames), in32(iem)).astype(np.float64)
+        return roundfp(p, fmt) if 'output' in roundat else p
+
+    def rnd(x):
+        return roundfp(x, fmt)
+    def keep(x):
+        return x
+    rin = rnd if 'input' in roundat else keep
+    rprod = rnd if 'product' in roundat else keep
+    rsum = rnd if 'sum' in roundat else keep
+
+    a = rin(frames)
+    b = rin(iem)
+
+    b = b.reshape(h, nblocks, width, sprime)
+    out = np.empty((nframes, sprime))
+    for start in range(0, nframes, chunk):
+        end = min(start + chunk, nframes)
+        x = a[start:end].reshape(end - start, h, nblocks, width)
+        s = rprod(x[..., None] * b)  # (n, h, nblocks, width, sprime)
+        if order == 'sequential':
+            acc = s[:, :, :, 0]
+            for i in range(1, width):
+                acc = rsum(acc + s[:, :, :, i])
+            s = acc
+        elif order == 'tree':
+            while s.shape[3] > 1:
+                k = s.shape[3]
+                pair = rsum(s[:, :, :, 0:k - 1:2] + s[:, :, :, 1:k:2])
+                s = np.concatenate((pair, s[:, :, :, k - 1:k]), axis=3) if k % 2 else pair
+            s = s[:, :, :, 0]
+        else:
+            raise ValueError(f"projectPCA_fp: unknown order '{order}'")
+        # s: (n, h, nblocks, sprime)
+        acc = s[:, 0]
+        for r in range(1, h):
+            acc = rsum(acc + s[:, r])
+        tot = acc[:, 0]
+        for j in range(1, nblocks):
+            tot = rsum(tot + acc[:, j])
+        out[start:end] = tot
+    return out
+
+
+def evaluatePCA_fp_batch(frames, rem, iem, fmt, roundat=('input', 'output'), order='sequential',
+                         blockgeom=None):
+    """Frames projected with projectPCA_fp(). Returns (mse per frame, data_approx)."""
+    data = np.atleast_2d(frames).astype(np.float64)
+    weighting_matrix = projectPCA_fp(data, iem[:, :rem.shape[0]], fmt, roundat, order, blockgeom)
+    data_approx = decodePCA(weighting_matrix, rem, prec='float64')
+    mse = np.mean((data - data_approx)**2, axis=1)
+    return (mse, data_approx)
+
+
+def evaluatePCA_qvec_batch(frames, rem, iem, qv):
+    """Vectorized evaluatePCA_qvec() with exact integer reduction.
+
+    Returns (mse per frame, data_approx).
+    """
+    data = np.atleast_2d(frames)
+    coefs = compressPCA_qvec(data, quantizeIEM(iem, qv))
+    data_approx = decodePCA(coefs, rem, qv, prec='float64')
+    mse = np.mean((data - data_approx)**2, axis=1)
+    return (mse, data_approx)
+
+
+#
+# block-local PCA: one basis per column strip of PCACompBlock
+#
+
+def splitstrips(frames, shape, nblocks):
+    """(nframes, nrows*ncols) frames to nblocks (nframes, nrows*width) strips."""
+    (nrows, ncols) = shape[-2:]
+    width = ncols // nblocks
+    f = np.asarray(frames).reshape(-1, nrows, nblocks, width)
+    return [np.ascontiguousarray(f[:, :, b, :]).reshape(f.shape[0], nrows * width)
+            for b in range(nblocks)]
+
+def mergestrips(strips, shape, nblocks):
+    """Inverse of splitstrips()."""
+    (nrows, ncols) = shape[-2:]
+    width = ncols // nblocks
+    f = np.stack([s.reshape(-1, nrows, width) for s in strips], axis=2)
+    return f.reshape(f.shape[0], nrows * ncols)
+
+def loadencoding_blocks(sprimes, encfn):
+    """Reduced encoding and inverse per strip from compute_pca_encoding.py."""
+    enc = np.load(encfn)
+    nblocks = enc.shape[0]
+    if np.isscalar(sprimes):
+        sprimes = [sprimes] * nblocks
+    renc = [enc[b, :sprimes[b], :] for b in range(nblocks)]
+    inv = [np.linalg.pinv(r) for r in renc]
+    return (renc, inv)
+
+def evaluatePCA_blocks(frames, shape, rems, iems, nbits, workers=None):
+    """Evaluate each strip with its own quantized basis, in parallel.
+
+    Returns (mse per frame, mse per strip and frame).
+    """
+    nblocks = len(rems)
+    strips = splitstrips(frames, shape, nblocks)
+
+    def evalstrip(b):
+        qv = getquantizationvector(iems[b], nbits)
+        return evaluatePCA_qvec_batch(strips[b], rems[b], iems[b], qv)
+
+    # the GEMMs release the GIL, threads are enough
+    with ThreadPoolExecutor(max_workers=workers or nblocks) as ex:
+        res = list(ex.map(evalstrip, range(nblocks)))
+    stripmse = np.stack([r[0] for r in res])
+    approx = mergestrips([r[1] for r in res], shape, nblocks)
+    mse = np.mean((np.asarray(frames) - approx)**2, axis=1)
+    return (mse, stripmse)
+
+
+def quantizeIEM(iem, qv, invprec='int32'):
+    """Quantize each column of the inverse encoding matrix with its qv scale."""
+    sprime = len(qv)
+    return (iem[:, :sprime] / np.asarray(qv, dtype=np.float64)).astype(invprec)
+
+
+def compressPCA_qvec(frames, iemq, dataprec='int16'):
+    """Raw integer outputs of the block for a batch of frames.
+
+    frames is (nframes, npixels), iemq is the quantized IEM from
+    quantizeIEM(). The reduction is exact like the hardware
+    accumulator, so the result matches what io.out emits summed over
+    the blocks. It runs as a float64 GEMM while every partial sum stays
+    below 2^53, otherwise in int64 (which has no BLAS path).
+    """
+    data = np.atleast_2d(frames).astype(dataprec)
+    iemq = np.asarray(iemq)
+    info = np.iinfo(data.dtype)
+    bound = data.shape[1] * max(-int(info.min), int(info.max)) * int(np.max(np.abs(iemq), initial=0))
+    if bound < (1 << 53):
+        return np.matmul(data.astype(np.float64), iemq.astype(np.float64)).astype(np.int64)
+    return np.matmul(data.astype(np.int64), iemq.astype(np.int64))
+
+
+#
+# block floating point IEM: the width values of a PC that are read
+# together from one SRAM row (one word per row, block and PC) share an
+# exponent, stored as a right shift relative to the per-PC qv scale
+#
+
+def quantizeIEM_bfp(iem, qv, nbits, expbw, blockgeom, invprec='int32'):
+    """Quantize the IEM with nbits mantissas and one shift per SRAM word.
+
+    qv is the per-PC scale from getquantizationvector_sym(iem, nbits),
+    so every mantissa fits nbits plus the sign bit with no shift. Each
+    word gets the largest shift in [0, 2^expbw - 1] that keeps its
+    mantissas within nbits, so expbw=0 is quantizeIEM(). blockgeom is
+    (h, w, nblocks).
+
+    Returns (mantissas as (npixels, sprime), shifts as (h, nblocks, sprime)).
+    """
+    sprime = len(qv)
+    (h, w, nblocks) = blockgeom
+    v = (iem[:, :sprime] / np.asarray(qv, dtype=np.float64)).reshape(h, nblocks, w // nblocks, sprime)
+    imax = (1 << nbits) - 1
+    maxshift = (1 << expbw) - 1
+    amax = np.max(np.abs(v), axis=2)
+    with np.errstate(divide='ignore'):
+        shift = np.floor(np.log2(imax / amax))
+    shift = np.clip(np.nan_to_num(shift, posinf=maxshift), 0, maxshift).astype(np.int64)
+    mant = (v * np.exp2(shift)[:, :, None, :]).astype(invprec)
+    return (mant.reshape(-1, sprime), shift)
+
+def dequantizeIEM_bfp(mant, shift, qv, blockgeom):
+    """Float IEM represented by quantizeIEM_bfp()."""
+    (h, w, nblocks) = blockgeom
+    sprime = mant.shape[1]
+    m = mant.reshape(h, nblocks, w // nblocks, sprime).astype(np.float64)
+    m *= np.exp2(-shift)[:, :, None, :]
+    return m.reshape(-1, sprime) * np.asarray(qv, dtype=np.float64)
+
+def compressPCA_bfp(frames, mant, shift, blockgeom, dataprec='int16'):
+    """Raw integer outputs with a block floating point IEM.
+
+    Each mantissa is aligned to the smallest scale by shifting it left
+    by max(shift) - shift, so the reduction stays exact in int64 and
+    the accumulator grows by max(shift) bits. The result is in units of
+    qv * 2^-max(shift).
+    """
+    (h, w, nblocks) = blockgeom
+    sprime = mant.shape[1]
+    align = int(np.max(shift)) - shift
+    m = mant.reshape(h, nblocks, w // nblocks, sprime).astype(np.int64) << align[:, :, None, :]
+    data = np.atleast_2d(frames).astype(dataprec).astype(np.int64)
+    return np.matmul(data, m.reshape(-1, sprime))
+
+def evaluatePCA_bfp(frames, rem, iem, nbits, expbw, blockgeom):
+    """evaluatePCA_qvec_batch() with a block floating point IEM.
+
+    Returns (mse per frame, data_approx).
+    """
+    data = np.atleast_2d(frames)
+    qv = getquantizationvector_sym(iem, nbits)
+    (mant, shift) = quantizeIEM_bfp(iem, qv, nbits, expbw, blockgeom)
+    coefs = compressPCA_bfp(data, mant, shift, blockgeom)
+    qvs = np.asarray(qv) * np.exp2(-int(np.max(shift)))
+    data_approx = decodePCA(coefs, rem, qvs, prec='float64')
+    mse = np.mean((data - data_approx)**2, axis=1)
+    return (mse, data_approx)
+
+
+def decodePCA(coefs, rem, qv=None, out=None, prec='float32', tile=256):
+    """Reconstruct frames from a block of coefficient vectors.
+
+    coefs is (nframes, sprime). When qv is given, coefs are the raw
+    integer outputs of the block and qv is folded into the reduced
+    encoding matrix once, so each tile of frames costs a single GEMM.
+    The clip to non-negative pixels is applied in place on the GEMM
+    output. Frames are written into out, which may be a caller-provided
+    array or a memmap from open_decodebuf(); otherwise it is allocated.
+    """
+    coefs = np.atleast_2d(coefs)
+    nframes, sprime = coefs.shape
+
+    rem = rem[:sprime]
+    if qv is not None:
+        rem = np.asarray(qv, dtype=np.float64)[:sprime, None] * rem
+    rem = np.ascontiguousarray(rem, dtype=prec)
+    npixels = rem.shape[1]
+
+    if out is None:
+        out = np.empty((nframes, npixels), dtype=prec)
+    if out.shape != (nframes, npixels):
+        raise ValueError(f"decodePCA: out{out.shape} does not match ({nframes}, {npixels})")
+
+    # write straight into out when the GEMM can target it, otherwise
+    # go through one tile-sized scratch buffer
+    direct = out.dtype == rem.dtype and out.flags.c_contiguous
+    buf = None if direct else np.empty((min(tile, nframes), npixels), dtype=prec)
+
+    for start in range(0, nframes, tile):
+        end = min(start + tile, nframes)
+        dst = out[start:end] if direct else buf[:end - start]
+        np.matmul(coefs[start:end].astype(prec, copy=False), rem, out=dst)
+        np.maximum(dst, 0, out=dst)
+        if not direct:
+            out[start:end] = dst
+    return out
+
+
+def open_decodebuf(fn, nframes, npixels, prec='float32'):
+    """Memory-mapped .npy output for decodePCA()."""
+    return np.lib.format.open_memmap(fn, mode='w+', dtype=prec, shape=(nframes, npixels))
+
+
+def loadframes(datafn):
+    """Memory-mapped frames as (nframes, npixels) and the original shape."""
+    d = np.load(datafn, mmap_mode='r')
+    return (d.reshape(d.shape[0], -1), d.shape)
+
+
+def evaluatePCA_sparse(frames, rem, iem, qv=None, threshold=0.25, chunk=64, blockgeom=None):
+    """Projection that only touches the nonzero pixels of each frame.
+
+    Frames whose density (fraction of nonzero pixels) is at most
+    threshold are projected as a CSR matrix, so only their nonzero
+    pixels are multiplied. The other frames take the dense GEMM. chunk
+    frames are read and projected together. With qv, the IEM is
+    quantized and the reduction is exact integer arithmetic as in the
+    hardware.
+
+    blockgeom=(h, w, nblocks) additionally counts the row segments of a
+    block that are all zero, i.e. the cycles a zero-skipping block could
+    skip.
+
+    Returns (mse per frame, density per frame, stats).
+    """
+    from scipy import sparse
+
+    nframes, npixels = frames.shape
+    sprime = rem.shape[0]
+    if qv is not None:
+        iemm = quantizeIEM(iem, qv).astype(np.int64)
+    else:
+        iemm = iem[:, :sprime]
+
+    mse = np.empty(nframes)
+    density = np.empty(nframes)
+    stats = {'dense_frames': 0, 'sparse_frames': 0, 'nnz': 0,
+             'mults_dense': nframes * npixels * sprime, 'mults_done': 0,
+             'segments': 0, 'zero_segments': 0}
+
+    for start in range(0, nframes, chunk):
+        end = min(start + chunk, nframes)
+        blk = np.asarray(frames[start:end])
+        nz = blk != 0
+        nnz = np.count_nonzero(nz, axis=1)
+        density[start:end] = nnz / npixels
+        stats['nnz'] += int(np.sum(nnz))
+
+        issparse = density[start:end] <= threshold
+        sp = np.flatnonzero(issparse)
+        dn = np.flatnonzero(~issparse)
+        wm = np.empty((end - start, sprime), dtype=np.int64 if qv is not None else np.float64)
+        if len(sp):
+            csr = sparse.csr_matrix(blk[sp]).astype(wm.dtype)
+            wm[sp] = csr @ iemm
+            stats['sparse_frames'] += len(sp)
+            stats['mults_done'] += int(np.sum(nnz[sp])) * sprime
+        if len(dn):
+            if qv is not None:
+                wm[dn] = compressPCA_qvec(blk[dn], iemm)
+            else:
+                wm[dn] = np.matmul(blk[dn].astype(np.float64), iemm)
+            stats['dense_frames'] += len(dn)
+            stats['mults_done'] += len(dn) * npixels * sprime
+
+        approx = decodePCA(wm, rem, qv, prec='float64')
+        mse[start:end] = np.mean((blk - approx)**2, axis=1)
+
+        if blockgeom is not None:
+            (h, w, nblocks) = blockgeom
+            seg = nz.reshape(end - start, h, nblocks, w // nblocks).any(axis=3)
+            stats['segments'] += seg.size
+            stats['zero_segments'] += int(seg.size - np.count_nonzero(seg))
+
+    stats['density'] = stats['nnz'] / (nframes * npixels)
+    stats['mults_nonzero'] = stats['nnz'] * sprime
+    return (mse, density, stats)
+
+
 def save_sintdata(fn, data):
-    with open(fn, "wb") as f:
-        for d in data:
-            p = struct.pack("<q", d)  # q for 64-bit, i for 32-bit. < for little endian
-            f.write(p)
+    # raw little-endian int64 per value. see save_packed() for the
+    # bit-packed container
+    np.asarray(data, dtype='<i8').tofile(fn)
+
+
+#
+# hardware configuration (configs/*.json), same defaults as PCAConfig
+#
+
+# configs/default.json of the repo, wherever the scripts are run from
+DEFAULT_CONFIG = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'configs', 'default.json'))
+
+def log2ceil(x):
+    return (int(x) - 1).bit_length()
+
+def loadconfig(fn):
+    cfg = {'w': 12, 'h': 3, 'pxbw': 9, 'm': 7, 'encbw': 8, 'nblocks': 3,
+           'seed': None, 'nonegative': False}
+    with open(fn) as f:
+        cfg.update({k: v for k, v in json.load(f).items() if not k.startswith('_')})
+    if cfg['w'] % cfg['nblocks'] != 0:
+        raise ValueError(f"w ({cfg['w']}) must be divisible by nblocks ({cfg['nblocks']})")
+    return cfg
+
+def fitconfig(cfg, shape):
+    """cfg with the frame geometry (h, w) of the data."""
+    (h, w) = shape[-2:]
+    if w % cfg['nblocks'] != 0:
+        raise ValueError(f"data w ({w}) must be divisible by nblocks ({cfg['nblocks']})")
+    return dict(cfg, h=h, w=w)
+
+def calcredbw(cfg):
+    """Width of each PC on io.out, as computed in PCACompBlock."""
+    width = cfg['w'] // cfg['nblocks']
+    return cfg['pxbw'] + cfg['encbw'] + log2ceil(width) + log2ceil(cfg['h'])
+
+def calcsumbw(cfg):
+    """Width of each PC summed over the nblocks io.out streams, i.e. of
+    the whole-frame coefficients from compressPCA_qvec()."""
+    return calcredbw(cfg) + log2ceil(cfg['nblocks'])
+
+
+#
+# packed coefficient container
+#
+# layout: fixed prefix (magic, version, header length, frame count),
+# a JSON header (config, redbw, sprime, qv, frame size) padded to
+# PACKED_ALIGN, then one record per frame. A record holds the sprime
+# coefficients as redbw-bit two's complement values, PC0 in the LSBs,
+# in little-endian byte order, padded to a whole number of bytes so
+# that frame k sits at a fixed offset. The coefficients are whole-frame
+# sums over the blocks, so redbw is calcsumbw(), not the io.out width.
+#
+
+PACKED_MAGIC = b'PCAC'
+PACKED_VERSION = 1
+PACKED_PREFIX = struct.Struct('<4sHIQ')  # magic, version, hdrlen, nframes
+PACKED_ALIGN = 64
+
+def packedframebytes(sprime, redbw):
+    return (sprime * redbw + 7) // 8
+
+def packsint(coefs, bw):
+    """Pack (nframes, sprime) signed ints into bw-bit fields per frame."""
+    coefs = np.atleast_2d(np.asarray(coefs, dtype=np.int64))
+    nframes, sprime = coefs.shape
+    lim = 1 << (bw - 1)
+    if coefs.size and (coefs.min() < -lim or coefs.max() >= lim):
+        raise ValueError(f"packsint: values out of range for {bw} bits")
+    u = coefs.astype(np.uint64) & np.uint64((1 << bw) - 1)
+    bits = ((u[:, :, None] >> np.arange(bw, dtype=np.uint64)) & np.uint64(1)).astype(np.uint8)
+    return np.packbits(bits.reshape(nframes, sprime * bw), axis=1, bitorder='little')
+
+def unpacksint(packed, bw, sprime):
+    """Inverse of packsint()."""
+    packed = np.atleast_2d(packed)
+    bits = np.unpackbits(packed, axis=1, count=sprime * bw, bitorder='little')
+    bits = bits.reshape(packed.shape[0], sprime, bw).astype(np.int64)
+    u = np.sum(bits << np.arange(bw, dtype=np.int64), axis=2)
+    return u - (bits[:, :, bw - 1] << bw)
+
+
+class PackedWriter:
+    """Append frames of raw coefficients to a packed container."""
+
+    def __init__(self, fn, sprime, redbw, qv, cfg=None, chunk=4096):
+        self.sprime = sprime
+        self.redbw = redbw
+        self.chunk = chunk
+        self.nframes = 0
+        hdr = {'sprime': sprime, 'redbw': redbw,
+               'framebytes': packedframebytes(sprime, redbw),
+               'qv': [float(q) for q in qv[:sprime]],
+               'config': cfg}
+        hdrbytes = json.dumps(hdr).encode()
+        pad = -(PACKED_PREFIX.size + len(hdrbytes)) % PACKED_ALIGN
+        hdrbytes += b' ' * pad
+        self.hdrlen = len(hdrbytes)
+        self.f = open(fn, 'wb')
+        self.f.write(PACKED_PREFIX.pack(PACKED_MAGIC, PACKED_VERSION, self.hdrlen, 0))
+        self.f.write(hdrbytes)
+
+    def write(self, coefs):
+        coefs = np.atleast_2d(coefs)
+        if coefs.shape[1] != self.sprime:
+            raise ValueError(f"PackedWriter: expected {self.sprime} coefficients per frame")
+        for start in range(0, coefs.shape[0], self.chunk):
+            self.f.write(packsint(coefs[start:start + self.chunk], self.redbw).tobytes())
+        self.nframes += coefs.shape[0]
+
+    def close(self):
+        # the frame count is only known at the end
+        self.f.seek(0)
+        self.f.write(PACKED_PREFIX.pack(PACKED_MAGIC, PACKED_VERSION,
+                                        self.hdrlen, self.nframes))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PackedReader:
+    """Memory-mapped random access to a packed container."""
+
+    def __init__(self, fn):
+        with open(fn, 'rb') as f:
+            (magic, version, hdrlen, nframes) = PACKED_PREFIX.unpack(f.read(PACKED_PREFIX.size))
+            if magic != PACKED_MAGIC or version != PACKED_VERSION:
+                raise ValueError(f"{fn}: not a packed coefficient file (version {PACKED_VERSION})")
+            hdr = json.loads(f.read(hdrlen))
+        self.header = hdr
+        self.sprime = hdr['sprime']
+        self.redbw = hdr['redbw']
+        self.qv = np.array(hdr['qv'])
+        self.config = hdr['config']
+        self.nframes = nframes
+        self.records = np.memmap(fn, dtype=np.uint8, mode='r',
+                                 offset=PACKED_PREFIX.size + hdrlen,
+                                 shape=(nframes, hdr['framebytes']))
+
+    def __len__(self):
+        return self.nframes
+
+    def frames(self, start=0, end=None):
+        end = self.nframes if end is None else end
+        return unpacksint(self.records[start:end], self.redbw, self.sprime)
+
+    def frame(self, k):
+        return self.frames(k, k + 1)[0]
+
+
+def save_packed(fn, coefs, redbw, qv, cfg=None):
+    with PackedWriter(fn, np.atleast_2d(coefs).shape[1], redbw, qv, cfg) as w:
+        w.write(coefs)
+
+def load_packed(fn):
+    """Return (coefs, qv, header) of a whole packed container."""
+    r = PackedReader(fn)
+    return (r.frames(), r.qv, r.header)
+
+
+#
+# SRAM preload images for PCACompBlock(preload = ...): one $readmemh
+# file per block and PC, one line per row holding the width IEM values
+# of the row packed like iemdata (value x at bits [x*encbw, (x+1)*encbw))
+#
+
+def iemhexwords(iemq, encbw, blockgeom):
+    """Hex words of the quantized IEM as (nblocks, sprime, h) strings."""
+    (h, w, nblocks) = blockgeom
+    width = w // nblocks
+    sprime = iemq.shape[1]
+    v = np.asarray(iemq).reshape(h, nblocks, width, sprime).transpose(1, 3, 0, 2)
+    packed = packsint(v.reshape(-1, width), encbw)  # little-endian bytes per word
+    ndigits = (width * encbw + 3) // 4
+    words = [bytes(p[::-1]).hex()[-ndigits:] for p in packed]
+    return np.array(words).reshape(nblocks, sprime, h)
+
+def save_iemhex(prefix, iemq, encbw, blockgeom, npcs=None):
+    """Write {prefix}_block{b}_pc{s}.hex, PCs from sprime up to npcs as zeros.
+
+    Returns the per-block preload prefixes, {prefix}_block{b}.
+    """
+    (h, w, nblocks) = blockgeom
+    words = iemhexwords(iemq, encbw, blockgeom)
+    sprime = words.shape[1]
+    npcs = npcs or sprime
+    zero = '0' * ((w // nblocks * encbw + 3) // 4)
+    prefixes = []
+    for b in range(nblocks):
+        bprefix = f'{prefix}_block{b}'
+        for s in range(npcs):
+            with open(f'{bprefix}_pc{s}.hex', 'w') as f:
+                f.write('\n'.join(words[b, s] if s < sprime else [zero] * h) + '\n')
+        prefixes.append(bprefix)
+    return prefixes
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# Streaming compression pipeline
+#
+#   source -> compress -> [decode] -> sink
+#
+# Each stage is an asyncio task connected to the next one with a
+# bounded queue. The work of a stage runs on its own thread so that
+# frame I/O, compression and decoding overlap (the NumPy kernels
+# release the GIL). A stage takes whatever frames are waiting, up to
+# --batch, and processes them in one GEMM.
+#
+# The replay source emits frames from .npy files at a fixed frame rate
+# like the sensor. A sensor cannot wait, so a frame that finds the first
+# queue full is dropped. The later stages apply backpressure instead.
+#
+# Per-stage service latency, queue depth, end-to-end latency and
+# dropped frames are reported at the end of the run.
+#
+# This code requires the same data files as estimate_pcacomp_error_mem.py:
+#   image frame data : data/{basename}.npy
+#   encoding data    : data/{basename}-encoding.npy
+#
+# Usage: pcapipeline.py [options]
+#
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from pcacomp import *
+
+
+class Frame:
+    __slots__ = ('seq', 't0', 'data', 'coefs', 'approx')
+
+    def __init__(self, seq, t0, data):
+        self.seq = seq
+        self.t0 = t0
+        self.data = data
+        self.coefs = None
+        self.approx = None
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.latency = []   # per batch, sec
+        self.batches = []   # frames per batch
+        self.depth = []     # queue depth when a batch is taken (output queue for the source)
+        self.frames = 0
+        self.dropped = 0
+
+    def record(self, latency, nframes, depth):
+        self.latency.append(latency)
+        self.batches.append(nframes)
+        self.depth.append(depth)
+        self.frames += nframes
+
+
+def replay_frames(fns, repeat=1):
+    """The memory-mapped frames of .npy files, repeat times in order."""
+    for r in range(repeat):
+        for fn in fns:
+            (frames, shape) = loadframes(fn)
+            for i in range(len(frames)):
+                yield frames[i]
+
+
+async def replay_source(fns, fps, outq, stats, nframes=None, repeat=1):
+    """Emit the frames of .npy files at fps frames per second."""
+    loop = asyncio.get_running_loop()
+    io = ThreadPoolExecutor(max_workers=1)
+    period = 1.0 / fps
+    seq = 0
+    tstart = loop.time()
+    for frame in replay_frames(fns, repeat):
+        if nframes is not None and seq >= nframes:
+            break
+        # absolute deadlines, so the rate does not drift
+        delay = tstart + seq * period - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        t0 = time.perf_counter()
+        data = await loop.run_in_executor(io, np.array, frame)
+        stats.record(time.perf_counter() - t0, 1, outq.qsize())
+        try:
+            outq.put_nowait(Frame(seq, t0, data))
+        except asyncio.QueueFull:
+            stats.dropped += 1
+        seq += 1
+    await outq.put(None)
+    io.shutdown()
+
+
+async def stage(fn, inq, outq, stats, batch):
+    """Run fn on batches of frames from inq and pass them on to outq."""
+    loop = asyncio.get_running_loop()
+    worker = ThreadPoolExecutor(max_workers=1)
+    done = False
+    while not done:
+        item = await inq.get()
+        if item is None:
+            break
+        items = [item]
+        depth = inq.qsize() + 1
+        while len(items) < batch and not inq.empty():
+            item = inq.get_nowait()
+            if item is None:
+                done = True
+                break
+            items.append(item)
+        t0 = time.perf_counter()
+        await loop.run_in_executor(worker, fn, items)
+        stats.record(time.perf_counter() - t0, len(items), depth)
+        if outq is not None:
+            for item in items:
+                await outq.put(item)
+    if outq is not None:
+        await outq.put(None)
+    worker.shutdown()
+
+
+def make_compress(iemq):
+    def compress(items):
+        coefs = compressPCA_qvec(np.stack([it.data for it in items]), iemq)
+        for (it, c) in zip(items, coefs):
+            it.coefs = c
+    return compress
+
+def make_decode(rem, qv):
+    def decode(items):
+        approx = decodePCA(np.stack([it.coefs for it in items]), rem, qv)
+        for (it, a) in zip(items, approx):
+            it.approx = a
+    return decode
+
+class MetricsSink:
+    """Streaming RMSE and end-to-end latency, optionally storing the coefficients."""
+
+    def __init__(self, writer=None):
+        self.writer = writer
+        self.e2e = []
+        self.rmse = []
+
+    def __call__(self, items):
+        now = time.perf_counter()
+        for it in items:
+            self.e2e.append(now - it.t0)
+            if it.approx is not None:
+                self.rmse.append(np.sqrt(np.mean((it.data - it.approx)**2)))
+        if self.writer is not None:
+            self.writer.write(np.stack([it.coefs for it in items]))
+
+
+async def run_pipeline(fns, fps, iemq, rem, qv, decode=True, qsize=8, batch=16,
+                       nframes=None, repeat=1, writer=None):
+    names = ['source', 'compress'] + (['decode'] if decode else []) + ['sink']
+    stats = [StageStats(n) for n in names]
+    queues = [asyncio.Queue(maxsize=qsize) for n in names[1:]]
+    sink = MetricsSink(writer)
+    fns_stage = [make_compress(iemq)] + ([make_decode(rem, qv)] if decode else []) + [sink]
+
+    tasks = [replay_source(fns, fps, queues[0], stats[0], nframes, repeat)]
+    for (i, fn) in enumerate(fns_stage):
+        outq = queues[i + 1] if i + 1 < len(queues) else None
+        tasks.append(stage(fn, queues[i], outq, stats[i + 1], batch))
+    t0 = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return (stats, sink, time.perf_counter() - t0)
+
+
+def print_report(stats, sink, elapsed, fps):
+    emitted = stats[0].frames
+    dropped = stats[0].dropped
+    print(f'frames: emitted={emitted} dropped={dropped} ({dropped/max(emitted,1):.2%}) '
+          f'completed={len(sink.e2e)} in {elapsed:.2f} sec ({len(sink.e2e)/elapsed:.1f} fps, target {fps:.1f})')
+    print('')
+    print(f'stage        batches  frames/batch  latency(ms) mean    p99     max   qdepth mean  max')
+    for s in stats:
+        if not s.latency:
+            continue
+        lat = np.array(s.latency) * 1e3
+        print(f'{s.name:10s} {len(lat):9d} {np.mean(s.batches):13.1f} {np.mean(lat):16.3f} '
+              f'{np.percentile(lat, 99):7.3f} {np.max(lat):7.3f} {np.mean(s.depth):11.2f} {np.max(s.depth):4d}')
+    if sink.e2e:
+        e2e = np.array(sink.e2e) * 1e3
+        print('')
+        print(f'end-to-end latency(ms): mean={np.mean(e2e):.3f} p50={np.percentile(e2e, 50):.3f} '
+              f'p99={np.percentile(e2e, 99):.3f} max={np.max(e2e):.3f}')
+    if sink.rmse:
+        (rmean, rstd, rminv, rmaxv) = basic_stats(sink.rmse)
+        print(f'RMSE: mean={rmean:.4f} std={rstd:.4f} min={rminv:.4f} max={rmaxv:.4f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Streaming PCA compression pipeline')
+    parser.add_argument('--sprime', type=int, default=25, help='number of principal components')
+    parser.add_argument('--nbits', type=int, default=8, help='IEM bit width including the sign bit')
+    parser.add_argument('--basename', default='data1small')
+    parser.add_argument('--files', nargs='*', default=None, help='.npy frame files to replay (default: the data file)')
+    parser.add_argument('--fps', type=float, default=1000.0, help='replay frame rate')
+    parser.add_argument('--nframes', type=int, default=None, help='stop after this many frames')
+    parser.add_argument('--repeat', type=int, default=1, help='replay the files this many times')
+    parser.add_argument('--qsize', type=int, default=8, help='bound of each queue')
+    parser.add_argument('--batch', type=int, default=16, help='max frames per stage batch')
+    parser.add_argument('--no-decode', action='store_true', help='skip the decode stage')
+    parser.add_argument('--packed', default=None, help='store the coefficients in a packed container')
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help='hardware config (pxbw, encbw, nblocks) for the record width')
+    args = parser.parse_args()
+
+    datafn = f'data/{args.basename}.npy'
+    encfn  = f'data/{args.basename}-encoding.npy'
+    enc = np.load(encfn)
+    rem = enc[:args.sprime, :]
+    inv = np.linalg.pinv(rem)
+    qv = getquantizationvector(inv, args.nbits - 1)  # -1 because of the sign bit
+    iemq = quantizeIEM(inv, qv)
+
+    fns = args.files or [datafn]
+    writer = None
+    if args.packed:
+        # the records hold whole-frame sums of frames shaped like the first file
+        try:
+            cfg = fitconfig(loadconfig(args.config), loadframes(fns[0])[1])
+        except ValueError as e:
+            print(f'{args.config}: {e}')
+            sys.exit(1)
+        writer = PackedWriter(args.packed, args.sprime, calcsumbw(cfg), qv, cfg)
+
+    (stats, sink, elapsed) = asyncio.run(run_pipeline(
+        fns, args.fps, iemq, rem, qv, not args.no_decode,
+        args.qsize, args.batch, args.nframes, args.repeat, writer))
+    if writer is not None:
+        writer.close()
+    print_report(stats, sink, elapsed, args.fps)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025, UChicago Argonne, LLC.
+# Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+#
+# On-disk store (SQLite) for accuracy evaluation results.
+#
+# An evaluation point is keyed by the content hashes of the data and
+# encoding files and the evaluation parameters (mode, sprime, nbits,
+# ...). Per-frame MSE is stored for each point, so a sweep that is
+# repeated or extended to more frames only computes the missing
+# frames. Aggregates over frame ranges are stored for plotting.
+#
+# Usage: pcaresults.py [dbfn] [mode]   # dump the aggregates as CSV
+#
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+
+DEFAULT_DB = 'data/pcaresults.sqlite'
+
+SCHEMA = """
+create table if not exists files (
+    path text primary key, size integer, mtime_ns integer, sha256 text);
+create table if not exists points (
+    key text primary key, datahash text, enchash text, mode text,
+    sprime integer, nbits integer, params text, created real);
+create table if not exists frames (
+    key text, fno integer, mse real, primary key (key, fno));
+create table if not exists aggregates (
+    key text, firstframe integer, lastframe integer, nframes integer,
+    rmse_mean real, rmse_std real, rmse_min real, rmse_max real,
+    primary key (key, firstframe, lastframe));
+"""
+
+
+class ResultStore:
+    def __init__(self, fn=DEFAULT_DB):
+        self.fn = fn
+        self.db = sqlite3.connect(fn)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def filehash(self, path):
+        """sha256 of a file, cached by path, size and mtime."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        row = self.db.execute('select size, mtime_ns, sha256 from files where path=?', (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for b in iter(lambda: f.read(1 << 24), b''):
+                h.update(b)
+        digest = h.hexdigest()
+        with self.db:
+            self.db.execute('insert or replace into files values (?,?,?,?)',
+                            (path, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def pointkey(self, datafn, encfn, mode, sprime, nbits, **params):
+        """Key of an evaluation point. nbits is None for modes without quantization."""
+        datahash = self.filehash(datafn)
+        enchash = self.filehash(encfn)
+        desc = json.dumps({'data': datahash, 'enc': enchash, 'mode': mode,
+                           'sprime': sprime, 'nbits': nbits, 'params': params}, sort_keys=True)
+        key = hashlib.sha256(desc.encode()).hexdigest()
+        with self.db:
+            self.db.execute('insert or ignore into points values (?,?,?,?,?,?,?,?)',
+                            (key, datahash, enchash, mode, sprime, nbits,
+                             json.dumps(params, sort_keys=True), time.time()))
+        return key
+
+    def get(self, key, fnos):
+        """Stored per-frame MSE of the given frames, as {fno: mse}."""
+        fnos = list(fnos)
+        if not fnos:
+            return {}
+        rows = self.db.execute('select fno, mse from frames where key=? and fno between ? and ?',
+                               (key, min(fnos), max(fnos))).fetchall()
+        wanted = set(fnos)
+        return {fno: mse for (fno, mse) in rows if fno in wanted}
+
+    def missing(self, key, fnos):
+        have = self.get(key, fnos)
+        return [fno for fno in fnos if fno not in have]
+
+    def put(self, key, results):
+        """Store {fno: mse}."""
+        with self.db:
+            self.db.executemany('insert or replace into frames values (?,?,?)',
+                                [(key, int(fno), float(mse)) for (fno, mse) in results.items()])
+
+    def put_aggregate(self, key, firstframe, lastframe, msearray):
+        rmse = np.sqrt(np.asarray(msearray))
+        with self.db:
+            self.db.execute('insert or replace into aggregates values (?,?,?,?,?,?,?,?)',
+                            (key, firstframe, lastframe, len(rmse), float(np.mean(rmse)),
+                             float(np.std(rmse)), float(np.min(rmse)), float(np.max(rmse))))
+
+    def query(self, mode=None, sprime=None, nbits=None, datahash=None):
+        """Aggregates joined with their points, for plotting."""
+        sql = ('select p.mode, p.sprime, p.nbits, p.params, p.datahash, p.enchash, '
+               'a.firstframe, a.lastframe, a.nframes, a.rmse_mean, a.rmse_std, a.rmse_min, a.rmse_max '
+               'from aggregates a join points p on a.key = p.key')
+        cond = []
+        vals = []
+        for (col, v) in (('p.mode', mode), ('p.sprime', sprime), ('p.nbits', nbits), ('p.datahash', datahash)):
+            if v is not None:
+                cond.append(f'{col}=?')
+                vals.append(v)
+        if cond:
+            sql += ' where ' + ' and '.join(cond)
+        sql += ' order by p.mode, p.sprime, p.nbits, a.firstframe, a.lastframe'
+        cols = ['mode', 'sprime', 'nbits', 'params', 'datahash', 'enchash', 'firstframe', 'lastframe',
+                'nframes', 'rmse_mean', 'rmse_std', 'rmse_min', 'rmse_max']
+        return [dict(zip(cols, row)) for row in self.db.execute(sql, vals)]
+
+
+def open_store(fn=None):
+    """Store selected by the PCARESULTS environment variable ('none' disables it)."""
+    fn = fn or os.environ.get('PCARESULTS', DEFAULT_DB)
+    if fn == 'none':
+        return None
+    return ResultStore(fn)
+
+
+if __name__ == '__main__':
+    dbfn = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB
+    mode = sys.argv[2] if len(sys.argv) > 2 else None
+    store = ResultStore(dbfn)
+    cols = ['mode', 'sprime', 'nbits', 'firstframe', 'lastframe', 'nframes',
+            'rmse_mean', 'rmse_std', 'rmse_min', 'rmse_max', 'datahash']
+    print(','.join(cols))
+    for r in store.query(mode=mode):
+        r['datahash'] = r['datahash'][:12]
+        print(','.join('' if r[c] is None else str(r[c]) for c in cols))
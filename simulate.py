@@ -6,7 +6,7 @@ This script provides a simple interface to generate Verilog using PCA JSON
 configuration files without requiring familiarity with sbt.
 
 Usage:
-    python3 simulate.py [config.json] [--test]
+    python3 simulate.py [config.json] [--test] [--preload PREFIX]
     python3 simulate.py configs/default.json
     python3 simulate.py configs/default.json --test  # Also generate test vectors and run tests
     
@@ -18,11 +18,16 @@ The script will:
 3. (If --test) Export test vectors from Scala test data generator
 4. (If --test) Run cocotb testbench to verify generated Verilog
 
+With --preload, the SRAMs are initialized from PREFIX_pc{i}.hex
+($readmemh images written by analysis/export_iem_hex.py), so a
+simulation can start computing without uploading the IEM.
+
 Examples:
     python3 simulate.py                    # Uses configs/default.json by default
     python3 simulate.py configs/default.json
     python3 simulate.py configs/default.json --test  # Generate and test
     python3 simulate.py configs/medium.json --test
+    python3 simulate.py configs/test_wide.json --preload generated/preload/data1small_block0
 """
 
 import sys
@@ -57,6 +62,13 @@ def main():
         action='store_true',
         help='Export test vectors and run cocotb testbench after generating Verilog'
     )
+    parser.add_argument(
+        '--preload',
+        type=str,
+        default=None,
+        metavar='PREFIX',
+        help='Preload the SRAMs from PREFIX_pc{i}.hex (see analysis/export_iem_hex.py)'
+    )
     
     args = parser.parse_args()
     
@@ -81,6 +93,20 @@ def main():
     
     # Build sbt command
     sbt_command = f'runMain pca.PCACompBlockJson "{config_str}"'
+    if args.preload:
+        # $readmemh paths are resolved by the simulator, make it absolute
+        preload_str = str(Path(args.preload).resolve())
+        if sys.platform == 'win32':
+            preload_str = preload_str.replace('\\', '/')
+        with open(config_path) as f:
+            npcs = json.load(f).get('m', 7)
+        missing = [f'{preload_str}_pc{i}.hex' for i in range(npcs)
+                   if not os.path.exists(f'{preload_str}_pc{i}.hex')]
+        if missing:
+            print(f"Error: SRAM preload file not found: {missing[0]}", file=sys.stderr)
+            sys.exit(1)
+        print(f"SRAM preload: {preload_str}_pc*.hex")
+        sbt_command += f' "{preload_str}"'
     
     try:
         # Run sbt command
@@ -101,7 +127,7 @@ def main():
                 if any(keyword in line.lower() for keyword in [
                     'loading config', 'config loaded', 'error', 
                     'w=', 'h=', 'pxbw=', 'm=', 'encbw=', 'nblocks=',
-                    'seed=', 'nonegative=', 'generated'
+                    'seed=', 'nonegative=', 'generated', 'preload'
                 ]) or line.strip().startswith('[error]'):
                     print(line)
         
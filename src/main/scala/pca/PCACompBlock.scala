@@ -8,9 +8,13 @@ import chisel3._
 import chisel3.util._
 import common.GenVerilog
 
+// preload: optional prefix of the SRAM init files, {preload}_pc{i}.hex for
+// PC i (see analysis/export_iem_hex.py). The IEM is then in place at
+// time zero and updateIEM is not needed (simulation only)
 class PCACompBlock(cfg: PCAConfig = PCAConfigPresets.default,
                    useSyncReadMem : Boolean = true,
-                   debugprint: Boolean = true
+                   debugprint: Boolean = true,
+                   preload: Option[String] = None
                   ) extends Module {
 
   // pixel-sensor params. the width and height of a block
@@ -67,7 +71,7 @@ class PCACompBlock(cfg: PCAConfig = PCAConfigPresets.default,
 //  val mems = Seq.fill(nmaxpcs)(SyncReadMem(nrows, UInt(busbw.W)))
 
   val mems = Seq.tabulate(nmaxpcs) { id =>
-    Module(new SRAM1RW(nrows, busbw, id, useSyncReadMem)) }
+    Module(new SRAM1RW(nrows, busbw, id, useSyncReadMem, preload.map(p => s"${p}_pc${id}.hex"))) }
   for(i <- 0 until nmaxpcs) {
     mems(i).io.en := true.B
     mems(i).io.we := false.B
@@ -270,9 +274,11 @@ object PCACompBlockJson extends App {
   } else {
     sys.env.getOrElse("PCAConfig", "default")
   }
+  // optional SRAM preload prefix, see PCACompBlock
+  val preload = if (args.length > 1) Some(args(1)) else None
 
   if(cfgfn == "default") {
-    GenVerilog(new PCACompBlock(PCAConfigPresets.cfg1))
+    GenVerilog(new PCACompBlock(PCAConfigPresets.cfg1, preload = preload))
   } else {
     println(s"Loading config from: $cfgfn")
     
@@ -314,8 +320,10 @@ object PCACompBlockJson extends App {
               s"m=${config.m}, encbw=${config.encbw}, nblocks=${config.nblocks}, " +
               s"seed=${config.seed}, nonegative=${config.nonegative}")
       
+      preload.foreach(p => println(s"SRAM preload: ${p}_pc*.hex"))
+
       // Generate Verilog with the loaded config
-      GenVerilog(new PCACompBlock(config))
+      GenVerilog(new PCACompBlock(config, preload = preload))
       
     } catch {
       case e: java.io.FileNotFoundException =>
@@ -6,9 +6,13 @@ package pca
 
 import chisel3._
 import chisel3.util._
+import chisel3.util.experimental.loadMemoryFromFileInline
 import common.GenVerilog
 
-class SRAM1RW(depth: Int, width: Int, id : Int, useSyncReadMem: Boolean = true) extends Module {
+// initFile: optional $readmemh image (one word per line) loaded into the
+// simulation memory at time zero
+class SRAM1RW(depth: Int, width: Int, id : Int, useSyncReadMem: Boolean = true,
+              initFile: Option[String] = None) extends Module {
   val io = IO(new Bundle {
     val en     = Input(Bool())                     // enable read/write
     val we     = Input(Bool())                     // write enable
@@ -22,8 +26,11 @@ class SRAM1RW(depth: Int, width: Int, id : Int, useSyncReadMem: Boolean = true)
     else
       s"${this.getClass.getSimpleName}__depth${depth}_width${width}_blackbox"
 
+  require(initFile.isEmpty || useSyncReadMem, "initFile requires useSyncReadMem")
+
   if (useSyncReadMem) {
     val mem = SyncReadMem(depth, UInt(width.W))
+    initFile.foreach(fn => loadMemoryFromFileInline(mem, fn))
 
     io.rdata := 0.U
     when(io.en) {
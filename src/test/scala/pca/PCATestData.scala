@@ -7,7 +7,8 @@ package pca
 import chisel3.BuildInfo
 import chisel3.util._
 
-import scala.util.Random
+import java.io.PrintWriter
+import scala.util.{Random, Using}
 
 /**
  * PCA testdata generation
@@ -71,6 +72,20 @@ class PCATestData(val cfg: PCAConfig = PCAConfigPresets.default) {
     convArray2BigInt(blockmat(encid)(blockid)(rowid), cfg.encbw)
   }
 
+  // SRAM preload images for PCACompBlock(preload = Some(prefix)), one
+  // iemdata word per row in $readmemh format, same as analysis/export_iem_hex.py
+  def writeIEMHex(prefix: String, blockid: Int) : Unit = {
+    val ndigits = (blockwidth * cfg.encbw + 3) / 4
+    for (encid <- 0 until cfg.m) {
+      Using.resource(new PrintWriter(s"${prefix}_pc${encid}.hex")) { out =>
+        for (rowid <- 0 until cfg.h) {
+          val word = getPerEncBlockRow2Bits(encid, blockid, rowid).toString(16)
+          out.println("0" * (ndigits - word.length) + word)
+        }
+      }
+    }
+  }
+
   def calcRefPerBlock() : Array[Array[Long]] = {
     val tmp: Array[Array[Long]] = Array.fill(cfg.nblocks, cfg.m)(0)
 
@@ -0,0 +1,172 @@
+// SPDX-License-Identifier: BSD-3-Clause
+// Copyright (c) 2025, UChicago Argonne, LLC.
+// Main author: Kazutomo Yoshii <kazutomo@anl.gov>. See LICENSE in project root.
+
+package pca
+
+import chisel3.simulator.EphemeralSimulator._
+import play.api.libs.json._
+
+import java.util.concurrent.Executors
+import scala.concurrent.duration.Duration
+import scala.concurrent.{Await, ExecutionContext, Future}
+import scala.io.Source
+import scala.util.Using
+
+/**
+ * Sharded simulation of a multi-block configuration
+ *
+ * Each PCACompBlock instance computes an independent column slice, so
+ * the blocks of a config are distributed over nworkers shards. Every
+ * shard owns its simulator instance (EphemeralSimulator compiles into
+ * a private temporary workspace and runs the model as a separate
+ * process) and runs its blocks back to back, reloading the IEM between
+ * blocks. The partial outputs are merged and compared against the
+ * per-block and the total references.
+ */
+object ShardedBlockSim {
+
+  // blockids per shard, round-robin
+  def assignBlocks(nblocks: Int, nworkers: Int): Seq[Seq[Int]] =
+    (0 until nworkers).map(s => (s until nblocks by nworkers).toSeq).filter(_.nonEmpty)
+
+  def resetBlock(dut: PCACompBlock): Unit = {
+    dut.reset.poke(true)
+    dut.clock.step(1)
+    dut.reset.poke(false)
+    dut.clock.step(1)
+  }
+
+  def updateIEM(dut: PCACompBlock, td: PCATestData, blockid: Int): Unit = {
+    val cfg = td.cfg
+    dut.io.verifyIEM.poke(false)
+    dut.io.updateIEM.poke(false)
+    dut.clock.step()
+    for (rowid <- 0 until cfg.h) {
+      for (encid <- 0 until cfg.m) {
+        dut.io.updateIEM.poke(true)
+        dut.io.rowid.poke(rowid)
+        dut.io.iempos.poke(encid)
+        dut.io.iemdata.poke(td.getPerEncBlockRow2Bits(encid, blockid, rowid))
+        dut.clock.step()
+      }
+    }
+    dut.clock.step()
+    dut.io.updateIEM.poke(false)
+  }
+
+  def computeBlock(dut: PCACompBlock, td: PCATestData, blockid: Int): Array[Long] = {
+    val cfg = td.cfg
+    dut.io.indatavalid.poke(true)
+    for (rowid <- 0 until cfg.h) {
+      dut.io.rowid.poke(rowid)
+      dut.io.indata.poke(td.convArray2BigInt(td.blockvec(blockid)(rowid), cfg.pxbw))
+      dut.clock.step()
+    }
+    dut.io.rowid.poke(0) // new frame
+    dut.io.indatavalid.poke(false)
+
+    dut.io.out.ready.poke(true)
+    while (!dut.io.out.valid.peek().litToBoolean) {
+      dut.clock.step()
+    }
+    val res = td.convBigInt2Array(dut.io.out.bits.peek().litValue, dut.redbw, cfg.m)
+    dut.clock.step() // dequeue before the next block
+    dut.io.out.ready.poke(false)
+    res
+  }
+
+  def runShard(td: PCATestData, blockids: Seq[Int]): Seq[(Int, Array[Long])] = {
+    var res = Seq.empty[(Int, Array[Long])]
+    simulate(new PCACompBlock(td.cfg, debugprint = false)) { dut =>
+      resetBlock(dut)
+      res = blockids.map { blockid =>
+        updateIEM(dut, td, blockid)
+        (blockid, computeBlock(dut, td, blockid))
+      }
+    }
+    res
+  }
+
+  // partial outputs indexed by blockid
+  def run(td: PCATestData, nworkers: Int): Array[Array[Long]] = {
+    val shards = assignBlocks(td.cfg.nblocks, nworkers)
+    val pool = Executors.newFixedThreadPool(shards.length)
+    implicit val ec: ExecutionContext = ExecutionContext.fromExecutorService(pool)
+    try {
+      val futures = shards.map(blockids => Future(runShard(td, blockids)))
+      val results = Await.result(Future.sequence(futures), Duration.Inf).flatten
+      val partials = Array.fill(td.cfg.nblocks)(Array.empty[Long])
+      for ((blockid, r) <- results) partials(blockid) = r
+      partials
+    } finally {
+      pool.shutdown()
+    }
+  }
+
+  def merge(partials: Array[Array[Long]]): Array[Long] = partials.transpose.map(_.sum)
+
+  def check(td: PCATestData, partials: Array[Array[Long]]): Boolean = {
+    var ok = true
+    for (blockid <- 0 until td.cfg.nblocks) {
+      if (!partials(blockid).sameElements(td.blockref(blockid))) {
+        println(s"block$blockid dut : ${partials(blockid).mkString(" ")}")
+        println(s"block$blockid ref : ${td.blockref(blockid).mkString(" ")}")
+        ok = false
+      }
+    }
+    val summed = merge(partials)
+    if (!summed.sameElements(td.ref)) {
+      println(s"merged dut : ${summed.mkString(" ")}")
+      println(s"merged ref : ${td.ref.mkString(" ")}")
+      ok = false
+    }
+    ok
+  }
+
+  def loadConfig(cfgfn: String): PCAConfig = {
+    if (cfgfn == "default") {
+      PCAConfigPresets.cfg1
+    } else {
+      Using.resource(Source.fromFile(cfgfn)) { src =>
+        val json = Json.parse(src.mkString)
+        val cfg = PCAConfig(
+          w = (json \ "w").asOpt[Int].getOrElse(12),
+          h = (json \ "h").asOpt[Int].getOrElse(3),
+          pxbw = (json \ "pxbw").asOpt[Int].getOrElse(9),
+          m = (json \ "m").asOpt[Int].getOrElse(7),
+          encbw = (json \ "encbw").asOpt[Int].getOrElse(8),
+          nblocks = (json \ "nblocks").asOpt[Int].getOrElse(3),
+          seed = (json \ "seed").asOpt[Int],
+          nonegative = (json \ "nonegative").asOpt[Boolean].getOrElse(false)
+        )
+        require(cfg.w % cfg.nblocks == 0, s"w (${cfg.w}) must be divisible by nblocks (${cfg.nblocks})")
+        cfg
+      }
+    }
+  }
+}
+
+/**
+ * Usage: sbt 'test:runMain pca.ShardedBlockSimMain configs/test_wide.json [nworkers]'
+ */
+object ShardedBlockSimMain extends App {
+  val cfgfn = if (args.length > 0) args(0) else "default"
+  val nworkers = if (args.length > 1) args(1).toInt else Runtime.getRuntime.availableProcessors()
+
+  val cfg = ShardedBlockSim.loadConfig(cfgfn)
+  val td = new PCATestData(cfg)
+  td.printInfo()
+  println(s"  shards: ${ShardedBlockSim.assignBlocks(cfg.nblocks, nworkers).map(_.mkString("[", ",", "]")).mkString(" ")}")
+
+  val st = System.nanoTime()
+  val partials = ShardedBlockSim.run(td, nworkers)
+  val elapsed = (System.nanoTime() - st) / 1e9
+
+  if (ShardedBlockSim.check(td, partials)) {
+    println(f"passed: ${cfg.nblocks} blocks on $nworkers workers in $elapsed%.1f sec")
+  } else {
+    println(f"failed: ${cfg.nblocks} blocks on $nworkers workers in $elapsed%.1f sec")
+    sys.exit(1)
+  }
+}